@@ -0,0 +1,139 @@
+"""
+CPU spent per concurrent stream in each playback mode.
+
+Every stream reads its audio source to the end as fast as possible, the way
+discord.py's player thread would over the track's duration. The CPU time of the
+bot process and its ffmpeg children is divided by the audio played, which gives
+the share of one core a real-time stream costs.
+
+Modes:
+   pcm          ffmpeg decodes to PCM, every 20 ms frame is Opus-encoded in-process
+                (skipped for the encoding part when libopus cannot be loaded)
+   opus         ffmpeg encodes Opus at OPUS_BITRATE
+   opus-copy    ffmpeg copies the Opus packets of an Opus source
+   native       WebMOpusAudio demuxes the WebM in-process, no ffmpeg
+
+Usage:
+   python benchmarks/playback_cpu.py [--streams 8] [--source track.webm] [--ffmpeg PATH]
+
+Without --source a 60 second Opus-in-WebM test tone is generated with ffmpeg.
+"""
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from handler.config import OPUS_BITRATE
+from handler.webm import WebMOpusAudio
+
+FRAME_SECONDS = 0.02
+
+def generate(ffmpeg: str, path: str, seconds: int) -> None:
+   subprocess.run(
+      [
+         ffmpeg, "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-f", "lavfi", "-i", f"anoisesrc=duration={seconds}:amplitude=0.05",
+         "-filter_complex", "amix=inputs=2,aformat=channel_layouts=stereo",
+         "-ar", "48000", "-c:a", "libopus", "-b:a", "128k", path
+      ],
+      check=True
+   )
+
+def pcmSource(ffmpeg: str, path: str):
+   return discord.FFmpegPCMAudio(path, executable=ffmpeg, options="-vn", before_options="-loglevel error")
+
+def opusSource(ffmpeg: str, path: str):
+   return discord.FFmpegOpusAudio(path, executable=ffmpeg, bitrate=OPUS_BITRATE, options="-vn", before_options="-loglevel error")
+
+def opusCopySource(ffmpeg: str, path: str):
+   return discord.FFmpegOpusAudio(path, executable=ffmpeg, codec="copy", options="-vn", before_options="-loglevel error")
+
+def nativeSource(ffmpeg: str, path: str):
+   audio = WebMOpusAudio(open(path, "rb"))
+   audio.open()
+   return audio
+
+MODES = {
+   "pcm": pcmSource,
+   "opus": opusSource,
+   "opus-copy": opusCopySource,
+   "native": nativeSource,
+}
+
+def play(factory, ffmpeg: str, path: str, encode: bool, frames: list) -> None:
+   """
+   Reads one stream to the end, encoding PCM frames like discord.py's voice client does.
+   """
+   source = factory(ffmpeg, path)
+   encoder = discord.opus.Encoder() if encode else None
+   count = 0
+   try:
+      while True:
+         data = source.read()
+         if not data:
+            break
+         if encoder is not None:
+            encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+         count += 1
+   finally:
+      source.cleanup()
+   frames.append(count)
+
+def cpuSeconds() -> float:
+   own = resource.getrusage(resource.RUSAGE_SELF)
+   children = resource.getrusage(resource.RUSAGE_CHILDREN)
+   return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def run(mode: str, ffmpeg: str, path: str, streams: int, encode: bool) -> tuple[float, float, float]:
+   """
+   Returns CPU seconds, audio seconds played and wall seconds.
+   """
+   frames: list = []
+   threads = [
+      threading.Thread(target=play, args=(MODES[mode], ffmpeg, path, encode, frames))
+      for _ in range(streams)
+   ]
+   cpu, wall = cpuSeconds(), time.perf_counter()
+   for thread in threads:
+      thread.start()
+   for thread in threads:
+      thread.join()
+   return cpuSeconds() - cpu, sum(frames) * FRAME_SECONDS, time.perf_counter() - wall
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--streams", type=int, default=8, help="concurrent streams per mode")
+   parser.add_argument("--source", default=None, help="Opus-in-WebM file to play")
+   parser.add_argument("--seconds", type=int, default=60, help="length of the generated test tone")
+   parser.add_argument("--ffmpeg", default=shutil.which("ffmpeg") or "ffmpeg")
+   parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+   args = parser.parse_args()
+
+   encode = discord.opus.is_loaded() or discord.opus._load_default()
+   if not encode:
+      print("libopus not found: pcm mode is measured without the in-process Opus encoding\n")
+
+   with tempfile.TemporaryDirectory() as directory:
+      path = args.source
+      if path is None:
+         path = os.path.join(directory, "tone.webm")
+         generate(args.ffmpeg, path, args.seconds)
+
+      print(f"{args.streams} concurrent streams per mode")
+      print(f"  {'mode':<10} {'core/stream':>12} {'streams/core':>13} {'audio s':>9} {'wall s':>8}")
+      for mode in args.modes:
+         cpu, audio, wall = run(mode, args.ffmpeg, path, args.streams, encode and mode == "pcm")
+         share = cpu / audio if audio else float("nan")
+         print(f"  {mode:<10} {share * 100:11.3f}% {1 / share if share else float('inf'):13.0f} {audio:9.0f} {wall:8.2f}")
+
+if __name__ == "__main__":
+   main()
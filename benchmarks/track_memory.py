@@ -0,0 +1,64 @@
+"""
+Memory of queued tracks: the slotted Track sharing a TrackInfo per video
+against the original one-dict-per-entry Track.
+
+Usage:
+   python benchmarks/track_memory.py [--entries 100000] [--videos 500]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handler.track import Track, BEGIN_URL
+
+class LegacyTrack:
+   """
+   The Track class as it was before metadata was shared between entries.
+   """
+   def __init__(self, title="", author="", url="", duration=0, thumbnail=None):
+      self.title = title
+      self.author = author
+      self.url = url
+      self.duration = duration
+      self.thumbnail = thumbnail
+      self.__stream_url = ""
+      self.__BEGIN_URL = "https://youtu.be/"
+
+def metadata(index: int) -> dict:
+   # Built per entry, like the info dictionaries the extraction returns
+   video_id = f"{index:011d}"
+   return {
+      "title": f"Artist {index} - Some Song Title (Official Video) {index}",
+      "author": f"Artist {index}",
+      "url": BEGIN_URL + video_id,
+      "duration": 180 + index % 120,
+      "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+   }
+
+def measure(factory, entries: int, videos: int) -> int:
+   gc.collect()
+   tracemalloc.start()
+   tracks = [factory(**metadata(i % videos)) for i in range(entries)]
+   size, _ = tracemalloc.get_traced_memory()
+   tracemalloc.stop()
+   del tracks
+   gc.collect()
+   return size
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--entries", type=int, default=100_000)
+   parser.add_argument("--videos", type=int, default=500, help="distinct videos among the entries")
+   args = parser.parse_args()
+
+   print(f"{args.entries} entries over {args.videos} distinct videos")
+   for name, factory in (("legacy Track", LegacyTrack), ("slotted Track", Track)):
+      size = measure(factory, args.entries, args.videos)
+      print(f"  {name:<14} {size / 2**20:8.1f} MB  {size / args.entries:6.0f} B/entry")
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,63 @@
+"""
+Per-lookup cost of a pooled YoutubeDL against building a fresh one per lookup.
+
+Without --url only the setup is timed: building an instance (fresh) against
+checking one out of the pool. With --url every iteration also extracts that
+video, which needs network access.
+
+Usage:
+   python benchmarks/ydl_pool.py [--iterations 20] [--url https://youtu.be/...]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp
+from handler.config import YDL_OPTIONS
+from utils.ydl_pool import url_pool, extractInfo
+
+def fresh(url: str | None) -> None:
+   with yt_dlp.YoutubeDL(YDL_OPTIONS) as ydl:
+      if url:
+         ydl.extract_info(url, download=False)
+
+def pooled(url: str | None) -> None:
+   if url:
+      extractInfo("url", url)
+   else:
+      with url_pool.acquire():
+         pass
+
+def timeit(func, url: str | None, iterations: int) -> list[float]:
+   timings = []
+   for _ in range(iterations):
+      started = time.perf_counter()
+      func(url)
+      timings.append((time.perf_counter() - started) * 1000)
+   return timings
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--iterations", type=int, default=20)
+   parser.add_argument("--url", default=None, help="video to extract on every iteration")
+   args = parser.parse_args()
+
+   # The first instance pays for loading the extractors either way
+   url_pool.warm(1)
+   fresh(None)
+
+   print(f"{args.iterations} lookups, {'extracting ' + args.url if args.url else 'setup only'}")
+   for name, func in (("fresh YoutubeDL", fresh), ("pooled YoutubeDL", pooled)):
+      timings = timeit(func, args.url, args.iterations)
+      print(
+         f"  {name:<17} median {statistics.median(timings):8.2f} ms"
+         f"  mean {statistics.mean(timings):8.2f} ms  max {max(timings):8.2f} ms"
+      )
+   url_pool.close()
+
+if __name__ == "__main__":
+   main()
@@ -2,26 +2,121 @@ from dotenv import dotenv_values
 import discord
 from discord.ext import commands
 import os
+import asyncio
+import json
+import hashlib
+import math
+import sys
+try:
+   import resource
+except ImportError:
+   # Not available on Windows, memory figures are reported as unknown there
+   resource = None
 from handler.music_handler import MusicHandler 
+from handler.handler_registry import HandlerRegistry
 from cogs.locales.locale_manager import LocaleManager
+from utils.extraction import extraction_executor, playlist_executor
+from utils.cache import metadata_cache
+from utils.http_client import http_client
+from utils.ydl_pool import warmPools, closePools
+from utils.utils import coalescingStats
+from utils.startup import startup_profile
+from handler.state_store import state_store
+from handler.config import INTENTS_PROFILE, COMMAND_TREE_HASH_PATH
 
-class Bot(commands.Bot):
+def gatewayProfile(profile: str) -> dict:
+   """
+   Builds the intents and cache settings of a gateway profile.
+
+   :param profile: "full" for every intent and the default caches, "lean" for only
+      what the cogs use: guilds and voice states, members cached only while in voice, no messages
+   :return: keyword arguments for the bot constructor
+   """
+   if profile == "lean":
+      intents = discord.Intents.none()
+      intents.guilds = True
+      intents.voice_states = True
+      return {
+         "intents": intents,
+         "member_cache_flags": discord.MemberCacheFlags.from_intents(intents),
+         "max_messages": None,
+         "chunk_guilds_at_startup": False
+      }
+   
+   if profile != "full":
+      print(f"Unknown intents profile {profile!r}, using full")
+   return {"intents": discord.Intents.all()}
+
+def peakMemoryKb() -> int | None:
+   """
+   Peak resident memory of the process, None where the platform does not report it.
+   """
+   if resource is None:
+      return None
+   peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+   # macOS reports bytes, Linux kilobytes
+   return peak // 1024 if sys.platform == "darwin" else peak
+
+def residentMemoryKb() -> int | None:
+   """
+   Current resident memory of the process, the peak where /proc is not available.
+   """
+   try:
+      with open("/proc/self/status") as f:
+         for line in f:
+            if line.startswith("VmRSS:"):
+               return int(line.split()[1])
+   except OSError:
+      pass
+   return peakMemoryKb()
+
+def formatMemory(kilobytes: int | None) -> str:
+   return "unknown" if kilobytes is None else f"{kilobytes // 1024} MB"
+
+class Bot(commands.AutoShardedBot):
    """
    Custom implementation of a Discord bot using discord.py library.
    Manages the bot's lifecycle, configuration, cogs loading, and per-guild music handlers.
+
+   The bot is sharded: on its own it runs every shard Discord recommends, and in
+   cluster mode each worker process runs only the shards it was given.
    """
-   def __init__(self):
+   def __init__(
+      self,
+      shard_ids: list[int] | None = None,
+      shard_count: int | None = None,
+      profile: str = INTENTS_PROFILE,
+      sync_commands: bool = True,
+      force_sync: bool = False
+   ):
       """
       Initializes the bot, sets intents, loads configuration from .env, and validates the token.
+
+      Args:
+         shard_ids: Shards run by this process, all of them when None.
+         shard_count: Total number of shards across all processes, required with `shard_ids`.
+         profile: Gateway profile deciding intents and caches, see `gatewayProfile`.
+         sync_commands: Whether this process syncs slash commands; in cluster mode only one worker does.
+         force_sync: Sync slash commands even if they did not change since the last sync.
       """
-      # Initialize the commands.Bot parent class with a prefix and all intents
-      super().__init__(command_prefix="!", intents=discord.Intents.all())
+      # Initialize the sharded bot parent class with a prefix and the profile's intents
+      super().__init__(
+         command_prefix="!",
+         shard_ids=shard_ids,
+         shard_count=shard_count,
+         **gatewayProfile(profile)
+      )
+      self.__profile = profile
+      self.__sync_commands = sync_commands
+      self.__force_sync = force_sync
       
-      # Dictionary to store a dedicated MusicHandler instance for each Discord server (guild)
-      self.__musicHandlers = {}
+      # Dedicated MusicHandler instance for each active Discord server (guild); idle ones are hibernated
+      self.__musicHandlers = HandlerRegistry(lambda guild_id: MusicHandler(self, guild_id))
 
       # Initialize local manager
-      self.locale_manager = LocaleManager(self)
+      with startup_profile.measure("init", "LocaleManager"):
+         self.locale_manager = LocaleManager(self)
+      self.__ready_reported = False
 
       # Load the bot token securely from the environment file
       token = self.load_token()
@@ -33,7 +128,8 @@ class Bot(commands.Bot):
    async def getMusicHandler(self, guild_id: int) -> MusicHandler:
       """
       Retrieves the MusicHandler instance for a specific guild ID.
-      Creates a new handler if one does not already exist for that guild.
+      Creates a new handler if one does not already exist for that guild,
+      restoring its queue from the state journal on first use or after hibernation.
 
       Args:
          guild_id: The unique ID of the Discord server (guild).
@@ -41,58 +137,217 @@ class Bot(commands.Bot):
       Returns:
          The MusicHandler instance for the specified guild.
       """
-      if guild_id not in self.__musicHandlers:
-         self.__musicHandlers[guild_id] = MusicHandler(self)
-         print(f"Created MusicHandler for server: {guild_id}")
-      
-      return self.__musicHandlers[guild_id]
+      return self.__musicHandlers.get(guild_id)
+
+   def musicHandler(self, guild_id: int):
+      """
+      Holds the MusicHandler of a guild for the duration of a `with` block.
+      Commands use this rather than `getMusicHandler`, so the handler is not
+      hibernated while they still await extraction or Discord.
+
+      Args:
+         guild_id: The unique ID of the Discord server (guild).
+
+      Returns:
+         A context manager yielding the MusicHandler instance.
+      """
+      return self.__musicHandlers.lease(guild_id)
+
+   @property
+   def handler_stats(self) -> dict:
+      """
+      Numbers of live and hibernated MusicHandlers.
+      """
+      return self.__musicHandlers.stats()
+
+   @property
+   def health(self) -> dict:
+      """
+      Snapshot of this process for the cluster supervisor: shards, guilds,
+      gateway latency, music handlers, extraction coalescing and peak memory.
+      """
+      latency = self.latency
+      return {
+         "ready": self.is_ready(),
+         "shards": sorted(self.shards),
+         "guilds": len(self.guilds),
+         "latency": latency if math.isfinite(latency) else None,
+         "handlers": self.handler_stats,
+         "extractions": coalescingStats(),
+         "max_rss_kb": peakMemoryKb()
+      }
+
+   @property
+   def cache_stats(self) -> dict:
+      """
+      Sizes of discord.py's caches and the resident memory of the process.
+      """
+      return {
+         "profile": self.__profile,
+         "guilds": len(self.guilds),
+         "members": sum(len(guild.members) for guild in self.guilds),
+         "users": len(self.users),
+         "messages": len(self.cached_messages),
+         "voice_clients": len(self.voice_clients),
+         "rss_kb": residentMemoryKb()
+      }
 
    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
       """
       Event handler triggered when a user's voice state changes (e.g., joins/leaves/moves channel).
 
       Used here to detect if the bot itself (self.user) is disconnected from a voice channel 
-      by a user action (e.g. kicked, or channel emptied), and sets the stop flag.
+      by a user action (e.g. kicked, or channel emptied), and stops playback.
       """
       # Check if the update event is about the bot itself
       if member == self.user:
          guild_id = member.guild.id
          
          # Case 1: Bot was in a channel (before) and is no longer (after is None)
+         handler = self.__musicHandlers.peek(guild_id)
          if before.channel and not after.channel:
-            if guild_id in self.__musicHandlers:
-               await self.__musicHandlers[guild_id].setStopFlag(True)
+            if handler is not None:
+               await handler.stop()
          
          # Case 2: Bot joins a new channel (this case seems redundant with Case 1 logic but included as in original)
-         # Note: The original logic here also sets the stop flag when *joining* a channel, which may be unintentional. 
+         # Note: The original logic here also stops playback when *joining* a channel, which may be unintentional. 
          # A typical implementation only stops when leaving/disconnecting.
          elif not before.channel and after.channel:
-             if guild_id in self.__musicHandlers:
-               await self.__musicHandlers[guild_id].setStopFlag(True)
+             if handler is not None:
+               await handler.stop()
 
 
    async def on_ready(self):
       """
-      Event handler called when the bot successfully connects to Discord.
-      Used to print connection status and synchronize application (slash) commands.
+      Event handler called when the bot successfully connects to Discord, and again after
+      every reconnect. Used to print connection status and cache sizes.
       """
       print(f'Бот вошел в систему как {self.user.name}')
+      if not self.__ready_reported:
+         self.__ready_reported = True
+         print(f"Ready {startup_profile.elapsed_ms:.0f} ms after start")
+      stats = self.cache_stats
+      print(
+         f"Cache ({stats['profile']} profile): {stats['guilds']} guilds, {stats['members']} members, "
+         f"{stats['users']} users, {stats['messages']} messages, RSS {formatMemory(stats['rss_kb'])}"
+      )
+
+   async def setup_hook(self):
+      """
+      Called once after login, before the gateway connects. Synchronizes application
+      (slash) commands here rather than in on_ready, so reconnects never trigger a sync.
+      """
+      if self.__sync_commands:
+         await self.sync_commands(force=self.__force_sync)
+
+   def command_tree_hash(self) -> str:
+      """
+      Stable hash of the registered slash commands, as they would be sent to Discord.
+      """
+      payload = sorted(
+         (command.to_dict(self.tree) for command in self.tree.get_commands()),
+         key=lambda command: (command.get("type", 1), command["name"])
+      )
+      data = json.dumps([self.application_id, payload], sort_keys=True, ensure_ascii=False)
+      return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+   async def sync_commands(self, force: bool = False) -> bool:
+      """
+      Synchronizes slash commands globally if they changed since the last sync.
+
+      Args:
+         force: Sync even if the stored hash matches.
+
+      Returns:
+         True if the commands were sent to Discord.
+      """
+      digest = self.command_tree_hash()
+      try:
+         with open(COMMAND_TREE_HASH_PATH, "r", encoding="utf-8") as f:
+            stored = f.read().strip()
+      except OSError:
+         stored = None
+      
+      if digest == stored and not force:
+         print("Слеш-команды не изменились, синхронизация пропущена.")
+         return False
+      
       try:
          # Synchronize slash commands globally with Discord's API
          synced = await self.tree.sync()
          print(f"Синхронизировано {len(synced)} слеш-команд(ы).")
       except Exception as e:
          print(f"Failed to sync slash commands: {e}")
+         return False
+      
+      try:
+         os.makedirs(os.path.dirname(COMMAND_TREE_HASH_PATH) or ".", exist_ok=True)
+         temporary = COMMAND_TREE_HASH_PATH + ".tmp"
+         with open(temporary, "w", encoding="utf-8") as f:
+            f.write(digest)
+         os.replace(temporary, COMMAND_TREE_HASH_PATH)
+      except OSError as e:
+         print(f"Failed to store command tree hash: {e}")
+      return True
+
+   @staticmethod
+   def read_manifest() -> dict:
+      """
+      Reads cogs/manifest.json: every cog to load, the intents it needs and,
+      under "after", the cogs that must be loaded before it.
+      """
+      with open("./cogs/manifest.json", "r", encoding="utf-8") as f:
+         return json.load(f)
+
+   async def __load_cog(self, name: str) -> None:
+      with startup_profile.measure("cog", name):
+         # Constructs the module path, e.g., "cogs.playcommand"
+         await self.load_extension(f"cogs.{name}")
+      print(f"Loaded cog: {name}")
 
    async def load(self):
       """
-      Loads all extension files (cogs) located in the './cogs' directory.
+      Loads the cogs listed in cogs/manifest.json. Cogs whose dependencies are
+      loaded are loaded together, then the startup profile is printed.
       """
-      for filename in os.listdir("./cogs"):
-         if filename.endswith(".py"):
-            # Constructs the module path, e.g., "cogs.playcommand"
-            await self.load_extension(f"cogs.{filename[:-3]}")
-            print(f"Loaded cog: {filename[:-3]}")
+      manifest = self.read_manifest()
+      pending = dict(manifest)
+      loaded = set()
+      while pending:
+         ready = [name for name, entry in pending.items() if set(entry.get("after", ())) <= loaded]
+         if not ready:
+            raise RuntimeError(f"Cogs with unresolvable dependencies in cogs/manifest.json: {', '.join(pending)}")
+         
+         await asyncio.gather(*(self.__load_cog(name) for name in ready))
+         for name in ready:
+            del pending[name]
+            loaded.add(name)
+      
+      self.check_intents(manifest)
+      print(startup_profile.report())
+
+   def check_intents(self, manifest: dict) -> list[str]:
+      """
+      Compares the intents each loaded cog declares in the manifest with
+      the intents of the active profile and warns about every gap.
+
+      Returns:
+         Warning messages, empty when every cog is covered.
+      """
+      enabled = {name for name, value in self.intents if value}
+      problems = []
+      for extension in self.extensions:
+         name = extension.removeprefix("cogs.")
+         if name not in manifest:
+            problems.append(f"Cog {name} does not declare its intents in cogs/manifest.json")
+            continue
+         missing = set(manifest[name].get("intents", ())) - enabled
+         if missing:
+            problems.append(f"Cog {name} needs intents missing from the {self.__profile} profile: {', '.join(sorted(missing))}")
+      
+      for problem in problems:
+         print(problem)
+      return problems
 
    def load_token(self) -> str:
       """
@@ -111,5 +366,22 @@ class Bot(commands.Bot):
       """
       # Use an async context manager for proper startup/shutdown
       async with self:
-         await self.load() # Load all functionality/commands
-         await self.start(self.__TOKEN) # Connect and start the bot loop
+         # Open the shared HTTP connection pool before anything can make a request
+         http_client.start()
+         try:
+            # Build the YoutubeDL instances while the cogs load and the gateway connects
+            extraction_executor.start(initializer=warmPools)
+            playlist_executor.start()
+            # Hibernate handlers of guilds that stopped using the bot
+            self.__musicHandlers.start()
+            await self.load() # Load all functionality/commands
+            await self.start(self.__TOKEN) # Connect and start the bot loop
+         finally:
+            # Release shared workers, caches and connections so the process can exit cleanly
+            self.__musicHandlers.close()
+            extraction_executor.shutdown()
+            playlist_executor.shutdown()
+            closePools()
+            metadata_cache.close()
+            state_store.close()
+            await http_client.close()
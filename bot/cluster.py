@@ -0,0 +1,261 @@
+import asyncio
+import multiprocessing
+import queue
+import signal
+import time
+import httpx
+from dotenv import dotenv_values
+from handler.config import (
+   CLUSTER_SHARD_COUNT,
+   CLUSTER_HEALTH_INTERVAL,
+   CLUSTER_HEALTH_TIMEOUT,
+   CLUSTER_REPORT_INTERVAL,
+   CLUSTER_MAX_RESTART_DELAY,
+   CLUSTER_IDENTIFY_DELAY
+)
+from utils.startup import startup_profile
+
+def fetchShardCount(token: str) -> int:
+   """
+   Asks Discord how many shards the bot should run.
+
+   :param token: bot token
+   :return: recommended shard count, 1 if Discord could not be asked
+   """
+   try:
+      response = httpx.get(
+         "https://discord.com/api/v10/gateway/bot",
+         headers={"Authorization": f"Bot {token}"},
+         timeout=10
+      )
+      response.raise_for_status()
+      return max(1, int(response.json()["shards"]))
+   except (httpx.HTTPError, KeyError, ValueError) as e:
+      print(f"Failed to fetch the recommended shard count, using 1: {e}")
+      return 1
+
+def splitShards(shard_count: int, workers: int) -> list[list[int]]:
+   """
+   Splits shards into contiguous ranges, one per worker, differing in size by at most one.
+   """
+   workers = max(1, min(workers, shard_count))
+   return [
+      list(range(i * shard_count // workers, (i + 1) * shard_count // workers))
+      for i in range(workers)
+   ]
+
+async def __report(bot, worker_id: int, health: multiprocessing.Queue) -> None:
+   while True:
+      try:
+         health.put_nowait((worker_id, time.time(), bot.health))
+      except Exception as e:
+         print(f"Worker {worker_id} failed to report health: {e}")
+      await asyncio.sleep(CLUSTER_HEALTH_INTERVAL)
+
+async def __serve(worker_id: int, shard_ids: list[int], shard_count: int, health: multiprocessing.Queue, force_sync: bool) -> None:
+   # Imported here so the supervisor process never loads discord.py, yt-dlp and the cogs
+   with startup_profile.measure("import", "bot.bot"):
+      from bot.bot import Bot
+
+   # Slash commands are global, so only the first worker syncs them
+   bot = Bot(shard_ids=shard_ids, shard_count=shard_count, sync_commands=worker_id == 0, force_sync=force_sync)
+   reporter = asyncio.create_task(__report(bot, worker_id, health))
+   try:
+      await bot.run()
+   finally:
+      reporter.cancel()
+
+def runWorker(worker_id: int, shard_ids: list[int], shard_count: int, health: multiprocessing.Queue, force_sync: bool = False) -> None:
+   """
+   Entry point of a worker process: runs a Bot owning `shard_ids`.
+   """
+   # Stop through KeyboardInterrupt on terminate, so the bot closes its stores and connections
+   signal.signal(signal.SIGTERM, signal.default_int_handler)
+   print(f"Worker {worker_id} starting shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}")
+   try:
+      asyncio.run(__serve(worker_id, shard_ids, shard_count, health, force_sync))
+   except KeyboardInterrupt:
+      pass
+
+class Worker:
+   """
+   Supervisor-side record of one worker process.
+   """
+   def __init__(self, worker_id: int, shard_ids: list[int]):
+      self.worker_id = worker_id
+      self.shard_ids = shard_ids
+      self.process: multiprocessing.Process | None = None
+      self.started_at = 0.0
+      self.last_report = 0.0
+      self.health: dict = {}
+      self.restarts = 0
+      # Consecutive crashes, reset once the worker stays up for a health timeout
+      self.failures = 0
+      self.restart_at: float | None = None
+
+class Supervisor:
+   """
+   Runs the bot as several worker processes, each owning a range of shards.
+
+   The supervisor starts the workers one after another so their logins respect
+   Discord's identify limit, restarts a worker that exits or stops reporting
+   (with exponential backoff when it keeps crashing), and periodically prints
+   health aggregated across all workers.
+   """
+   def __init__(self, workers: int, shard_count: int | None = CLUSTER_SHARD_COUNT, force_sync: bool = False):
+      """
+      Args:
+         workers: Number of worker processes.
+         shard_count: Total shards, None asks Discord for the recommended count.
+         force_sync: Have the first worker sync slash commands even if they did not change.
+      """
+      self.__force_sync = force_sync
+      self.__worker_count = workers
+      self.__shard_count = shard_count
+      self.__context = multiprocessing.get_context("spawn")
+      self.__health = self.__context.Queue()
+      self.__workers: list[Worker] = []
+      self.__running = False
+
+   def __spawn(self, worker: Worker) -> None:
+      # Not a daemon: workers start their own extraction processes
+      worker.process = self.__context.Process(
+         target=runWorker,
+         # A forced sync is done on the first start only, not again on every restart
+         args=(worker.worker_id, worker.shard_ids, self.__shard_count, self.__health, self.__force_sync and not worker.restarts),
+         name=f"bot-worker-{worker.worker_id}"
+      )
+      worker.process.start()
+      worker.started_at = worker.last_report = time.monotonic()
+      worker.health = {}
+      worker.restart_at = None
+
+   def __stop_process(self, worker: Worker) -> None:
+      process = worker.process
+      if process is None:
+         return
+      if process.is_alive():
+         process.terminate()
+         process.join(10)
+         if process.is_alive():
+            process.kill()
+            process.join()
+      worker.process = None
+
+   def __drain_health(self) -> None:
+      """
+      Stores the latest report of every worker.
+      """
+      while True:
+         try:
+            worker_id, _, health = self.__health.get_nowait()
+         except queue.Empty:
+            return
+         worker = self.__workers[worker_id]
+         worker.last_report = time.monotonic()
+         worker.health = health
+
+   def __check(self, worker: Worker) -> None:
+      """
+      Schedules a restart for a dead or hung worker and performs due restarts.
+      """
+      now = time.monotonic()
+      if worker.restart_at is not None:
+         if now >= worker.restart_at:
+            worker.restarts += 1
+            print(f"Restarting worker {worker.worker_id} (restart #{worker.restarts})")
+            self.__spawn(worker)
+         return
+
+      alive = worker.process is not None and worker.process.is_alive()
+      hung = alive and now - worker.last_report > CLUSTER_HEALTH_TIMEOUT
+      if alive and not hung:
+         if now - worker.started_at > CLUSTER_HEALTH_TIMEOUT:
+            worker.failures = 0
+         return
+
+      if hung:
+         print(f"Worker {worker.worker_id} has not reported for {now - worker.last_report:.0f}s, restarting")
+      else:
+         print(f"Worker {worker.worker_id} exited with code {worker.process.exitcode if worker.process else None}")
+      self.__stop_process(worker)
+
+      delay = min(2 ** worker.failures, CLUSTER_MAX_RESTART_DELAY)
+      worker.failures += 1
+      worker.restart_at = now + delay
+
+   def stats(self) -> dict:
+      """
+      Health aggregated across all workers.
+      """
+      reports = [worker.health for worker in self.__workers if worker.health]
+      latencies = [report["latency"] for report in reports if report.get("latency") is not None]
+      return {
+         "workers": len(self.__workers),
+         "alive": sum(1 for worker in self.__workers if worker.process is not None and worker.process.is_alive()),
+         "ready": sum(1 for report in reports if report.get("ready")),
+         "restarts": sum(worker.restarts for worker in self.__workers),
+         "shards": self.__shard_count,
+         "guilds": sum(report.get("guilds", 0) for report in reports),
+         "latency": sum(latencies) / len(latencies) if latencies else None,
+         "live_handlers": sum(report.get("handlers", {}).get("live", 0) for report in reports),
+         "hibernated_handlers": sum(report.get("handlers", {}).get("hibernated", 0) for report in reports),
+         "extractions": sum(report.get("extractions", {}).get("calls", 0) for report in reports),
+         "coalesced_extractions": sum(report.get("extractions", {}).get("coalesced", 0) for report in reports),
+         # Workers on platforms without memory figures report None
+         "max_rss_kb": sum(report.get("max_rss_kb") or 0 for report in reports)
+      }
+
+   def __print_stats(self) -> None:
+      stats = self.stats()
+      latency = f"{stats['latency'] * 1000:.0f}ms" if stats["latency"] is not None else "-"
+      print(
+         f"Cluster: {stats['alive']}/{stats['workers']} workers alive, {stats['ready']} ready, "
+         f"{stats['guilds']} guilds on {stats['shards']} shards, latency {latency}, "
+         f"handlers {stats['live_handlers']} live / {stats['hibernated_handlers']} hibernated, "
+         f"extractions {stats['extractions']} ({stats['coalesced_extractions']} coalesced), "
+         f"{stats['restarts']} restarts, peak RSS {stats['max_rss_kb'] // 1024} MB"
+      )
+
+   def stop(self, *_) -> None:
+      self.__running = False
+
+   def run(self) -> None:
+      """
+      Starts the workers and supervises them until interrupted.
+      """
+      if self.__shard_count is None:
+         self.__shard_count = fetchShardCount(dotenv_values("./.env").get("TOKEN", ""))
+
+      self.__workers = [
+         Worker(worker_id, shard_ids)
+         for worker_id, shard_ids in enumerate(splitShards(self.__shard_count, self.__worker_count))
+      ]
+      print(f"Starting {len(self.__workers)} workers for {self.__shard_count} shards")
+
+      self.__running = True
+      signal.signal(signal.SIGTERM, self.stop)
+      last_report = time.monotonic()
+      try:
+         for worker in self.__workers:
+            if not self.__running:
+               break
+            self.__spawn(worker)
+            # The next worker's logins must wait for these shards to identify
+            time.sleep(CLUSTER_IDENTIFY_DELAY * len(worker.shard_ids))
+            self.__drain_health()
+
+         while self.__running:
+            time.sleep(1)
+            self.__drain_health()
+            for worker in self.__workers:
+               self.__check(worker)
+            if time.monotonic() - last_report >= CLUSTER_REPORT_INTERVAL:
+               last_report = time.monotonic()
+               self.__print_stats()
+      except KeyboardInterrupt:
+         pass
+      finally:
+         print("Stopping workers")
+         for worker in self.__workers:
+            self.__stop_process(worker)
@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from handler.music_handler import MusicHandler
 
 class BackCommand(commands.Cog):
    """
@@ -26,27 +25,21 @@ class BackCommand(commands.Cog):
          )
          return
       
-      # Get the specific MusicHandler instance associated with this server (guild)
-      musicHandler: MusicHandler = await self.bot.getMusicHandler(guild_id)
-
-      if musicHandler.history_empty:
+      # This server's (guild's) MusicHandler, held for the whole command so it is never hibernated meanwhile
+      with self.bot.musicHandler(guild_id) as musicHandler:
+         if musicHandler.history_empty:
+            await interaction.response.send_message(
+               content=self.bot.locale_manager.get_text(guild_id, "back.history_empty"), 
+               ephemeral=True # Only the user sees this message
+            )
+            return
+      
+         voice = interaction.guild.voice_client
+         # The player task stops the current track and starts the previous one
+         await musicHandler.back(voice=voice)
          await interaction.response.send_message(
-            content=self.bot.locale_manager.get_text(guild_id, "back.history_empty"), 
-            ephemeral=True # Only the user sees this message
+            content=self.bot.locale_manager.get_text(guild_id, "back.returned"), 
          )
-         return
-      
-      musicHandler.back_flag = True
-      
-      voice = interaction.guild.voice_client
-      voice.stop()
-      await interaction.response.send_message(
-         content=self.bot.locale_manager.get_text(guild_id, "back.returned"), 
-      )
-
-      if not voice.is_playing() and not musicHandler.is_playing:
-         # If nothing was playing, start the playback loop using the MusicHandler's player method
-         await musicHandler.player(voice=voice)
 
 # Required setup function for Discord Cogs
 async def setup(bot):
@@ -1,8 +1,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from handler.music_handler import MusicHandler
-from utils.utils import formatDuration
+from utils.pagination import TrackPageView
 
 class HistoryCommand(commands.Cog):
    def __init__(self, bot):
@@ -25,73 +24,16 @@ class HistoryCommand(commands.Cog):
       
       await interaction.response.defer()
 
-      # Get the specific MusicHandler instance associated with this server (guild)
-      musicHandler: MusicHandler = await self.bot.getMusicHandler(guild_id)
+      # This server's (guild's) MusicHandler, held for the whole command so it is never hibernated meanwhile
+      with self.bot.musicHandler(guild_id) as musicHandler:
+         # The view renders one page at a time and lets the user flip through the rest
+         view = TrackPageView(self.bot, guild_id, TrackPageView.HISTORY)
+         embed = view.render(musicHandler)
 
-      current_track = musicHandler.get_current_track()
-      history_list = musicHandler.get_history()
-
-      # Creating an embed with a localized title
-      embed = discord.Embed(
-         title=self.bot.locale_manager.get_text(guild_id, "queue.title_history"), 
-         color=0x5865F2
-      )
-
-      # Description with current track
-      if not current_track or current_track.empty:
-         embed.description = self.bot.locale_manager.get_text(guild_id, "queue.nothing_playing") + "\n"
-      else: 
-         embed.description = self.bot.locale_manager.get_text(guild_id, "queue.currently_playing") + f"\n🚀 [{current_track.title}]({current_track.url}) `[{formatDuration(current_track.duration)}]`\n"
-         if current_track.thumbnail:
-            embed.set_thumbnail(url=current_track.thumbnail)
-
-      # History
-      if not history_list:
-         embed.add_field(
-            name=self.bot.locale_manager.get_text(guild_id, "queue.previous_in_list"),  
-            value=self.bot.locale_manager.get_text(guild_id, "queue.history_empty"),  
-            inline=False
-         )
-      else:
-         # Total duration of the entire story
-         total_seconds = sum(t.duration for t in history_list)
-         total_duration_str = formatDuration(total_seconds)
-
-         # We take only the first 10 tracks for display
-         display_history = history_list[:10]
-         lines = []
-
-         for i, t in enumerate(display_history):
-            dur = formatDuration(t.duration)
-            title = t.title[:50] + "..." if len(t.title) > 53 else t.title
-            lines.append(f"`{i+1}.` [{title}]({t.url}) `[{dur}]`")
-
-         history_str = "\n".join(lines)
-
-         # If there are more than 10 tracks, add a message about hidden
-         if len(history_list) > 10:
-            count = len(history_list) - 10
-            history_str += "\n\n" + self.bot.locale_manager.get_text(
-               guild_id, 
-               "queue.and_another", 
-               count=count, 
-               type=self.bot.locale_manager.get_text(
-                  guild_id, 
-                  "queue.type_history"
-               )
-            )
-
-         #We form the name of the field with the total duration
-         field_name = self.bot.locale_manager.get_text(guild_id, "queue.previous_in_list") + " (" + \
-                     self.bot.locale_manager.get_text(guild_id, "queue.total") + f": {total_duration_str})"
-
-         embed.add_field(
-            name=field_name,   
-            value=history_str, 
-            inline=False
-         )
-
-      await interaction.followup.send(embed=embed)
+         if view.pages > 1:
+            await interaction.followup.send(embed=embed, view=view)
+         else:
+            await interaction.followup.send(embed=embed)
 
 
 # Required setup function for Discord Cogs
@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from handler.music_handler import MusicHandler
 
 class LeaveCommand(commands.Cog):
    def __init__(self, bot):
@@ -20,19 +19,17 @@ class LeaveCommand(commands.Cog):
          )
          return
       
-      # Get the specific MusicHandler instance associated with this server (guild)
-      musicHandler: MusicHandler = await self.bot.getMusicHandler(guild_id)
+      # This server's (guild's) MusicHandler, held for the whole command so it is never hibernated meanwhile
+      with self.bot.musicHandler(guild_id) as musicHandler:
+         await musicHandler.stop()
       
-      musicHandler.stop_flag = True
+         voice = interaction.guild.voice_client
+         await voice.disconnect()
       
-      voice = interaction.guild.voice_client
-      voice.stop()
-      await voice.disconnect()
-      
-      await interaction.response.send_message(
-         content=self.bot.locale_manager.get_text(guild_id, "leave.left"),
-         ephemeral=True
-      )
+         await interaction.response.send_message(
+            content=self.bot.locale_manager.get_text(guild_id, "leave.left"),
+            ephemeral=True
+         )
 
 # Required setup function for Discord Cogs
 async def setup(bot):
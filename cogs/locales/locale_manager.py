@@ -57,6 +57,8 @@ class LocaleManager:
    
    def set_guild_locale(self, guild_id: int, language: str):
       if language in self.locales:
+         # Other cluster workers may have saved their guilds since this one started
+         self._load_guild_settings()
          self.guild_locales[guild_id] = language
          self._save_guild_settings()
          return True
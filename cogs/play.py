@@ -2,7 +2,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from handler.track import Track
-from utils.utils import extractInfoByUrl, isValidUrl, createEmbed
+from utils.utils import extractInfoByUrl, isValidUrl, isPlaylistUrl, iterPlaylist, createEmbed
 from handler.music_handler import MusicHandler
 
 class PlayCommand(commands.Cog):
@@ -17,14 +17,18 @@ class PlayCommand(commands.Cog):
       self.bot = bot
 
    @app_commands.command(name="play", description="Play audio.")
-   @app_commands.describe(url="The song to play (URL).")
-   async def play(self, interaction: discord.Interaction, url: str):
+   @app_commands.describe(
+      url="The song to play (URL).",
+      playlist="Add the whole playlist if the link contains one."
+   )
+   async def play(self, interaction: discord.Interaction, url: str, playlist: bool = False):
       """
       The main handler for the /play slash command.
 
       Args:
           interaction: The Discord interaction object representing the command invocation.
           url: The URL provided by the user for the track to be played.
+          playlist: Whether to enqueue every entry of the playlist the link points to.
       """
       # --- 1. Pre-checks ---
 
@@ -51,58 +55,98 @@ class PlayCommand(commands.Cog):
 
       voice = interaction.guild.voice_client
       
-      # Get the specific MusicHandler instance associated with this server (guild)
-      musicHandler: MusicHandler = await self.bot.getMusicHandler(guild_id)
+      # This server's (guild's) MusicHandler, held for the whole command so it is never hibernated meanwhile
+      with self.bot.musicHandler(guild_id) as musicHandler:
+         # --- 2. Validate and Extract Track Info ---
+
+         # Check if the provided string looks like a valid URL
+         if not await isValidUrl(url):
+            await interaction.followup.send(
+               content=self.bot.locale_manager.get_text(guild_id, "play.incorrect_link"),
+               ephemeral=True
+            )
+            return
       
-      # Ensure playback is not explicitly stopped if a new command is issued
-      musicHandler.stop_flag = False
+         # A /playlist link has no single video to fall back to, so it always enqueues the playlist
+         if isPlaylistUrl(url) and (playlist or "/playlist" in url):
+            await self.__play_playlist(interaction, musicHandler, voice, url)
+            return
 
-      # --- 2. Validate and Extract Track Info ---
+         try:
+            # Use the MusicHandler to fetch track metadata from the URL (e.g., via yt-dlp)
+            track: Track = await extractInfoByUrl(url)
+         except Exception as e:
+            # Handle potential errors during information extraction (e.g., video not found/private)
+            await interaction.followup.send(
+               content=self.bot.locale_manager.get_text(guild_id, "common.error", error=str(e))
+            )
+            return
+      
+         # --- 3. Add to Queue and Send Confirmation ---
 
-      # Check if the provided string looks like a valid URL
-      if not await isValidUrl(url):
-         await interaction.followup.send(
-            content=self.bot.locale_manager.get_text(guild_id, "play.incorrect_link"),
-            ephemeral=True
-         )
-         return
+         # Add the newly extracted track object to the queue
+         track.requester = interaction.user.id
+         musicHandler.add_track(track)
+
+         # Create a rich embed message to confirm the track was added
+         embed = createEmbed(track=track)
+
+         # Mention the user who added the song
+         embed.add_field(
+            name=self.bot.locale_manager.get_text(guild_id, "common.added_by"), 
+            value=f"<@{interaction.user.id}>", 
+            inline=False
+         ) 
       
+         # Send the confirmation message in the channel
+         await interaction.followup.send(embed=embed)
+
+         # --- 4. Start Playback ---
+
+         # Starts the queue if nothing is playing, otherwise the track just waits its turn
+         await musicHandler.play(voice=voice)
+
+   async def __play_playlist(self, interaction: discord.Interaction, musicHandler: MusicHandler, voice, url: str):
+      """
+      Enqueues a playlist entry by entry as yt-dlp lists it.
+
+      Playback starts as soon as the first entry is known, so the time to first audio
+      does not depend on the playlist length. Stream urls are resolved only when each
+      track is about to play.
+      """
+      guild_id = interaction.guild.id
+      count = 0
+
+      await interaction.followup.send(
+         content=self.bot.locale_manager.get_text(guild_id, "play.playlist_started")
+      )
+
       try:
-         # Use the MusicHandler to fetch track metadata from the URL (e.g., via yt-dlp)
-         track: Track = await extractInfoByUrl(url)
+         async for track in iterPlaylist(url):
+            track.requester = interaction.user.id
+            musicHandler.add_track(track)
+            count += 1
+
+            # Start playback right after the first entry instead of waiting for the whole list
+            if count == 1:
+               await musicHandler.play(voice=voice)
       except Exception as e:
-         # Handle potential errors during information extraction (e.g., video not found/private)
          await interaction.followup.send(
             content=self.bot.locale_manager.get_text(guild_id, "common.error", error=str(e))
          )
-         return
-      
-      # --- 3. Add to Queue and Send Confirmation ---
-
-      # Add the newly extracted track object to the queue
-      musicHandler.add_track(track)
+         if count == 0:
+            return
 
-      # Create a rich embed message to confirm the track was added
-      embed = createEmbed(track=track)
-
-      # Mention the user who added the song
-      embed.add_field(
-         name=self.bot.locale_manager.get_text(guild_id, "common.added_by"), 
-         value=f"<@{interaction.user.id}>", 
-         inline=False
-      ) 
-      
-      # Send the confirmation message in the channel
-      await interaction.followup.send(embed=embed)
-
-      # --- 4. Start Playback ---
-
-      # If music is already actively playing (the queue loop is running), we just added to the queue, so we return.
-      if voice.is_playing() or musicHandler.is_playing:
+      if count == 0:
+         await interaction.followup.send(
+            content=self.bot.locale_manager.get_text(guild_id, "play.playlist_empty"),
+            ephemeral=True
+         )
          return
-      
-      # If nothing was playing, start the playback loop using the MusicHandler's player method
-      await musicHandler.player(voice=voice)
+
+      await interaction.followup.send(
+         content=self.bot.locale_manager.get_text(guild_id, "play.playlist_added", count=count)
+      )
 
 # Required setup function for Discord Cogs
 async def setup(bot):
@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from handler.music_handler import MusicHandler
 from handler.queue_manager import RepeatMode
 
 class RepeatAllCommand(commands.Cog):
@@ -22,14 +21,13 @@ class RepeatAllCommand(commands.Cog):
          )
          return
       
-      # Get the specific MusicHandler instance associated with this server (guild)
-      musicHandler: MusicHandler = await self.bot.getMusicHandler(guild_id)
-      
-      new_mode = musicHandler.toggle_repeat_mode(RepeatMode.ALL)
+      # This server's (guild's) MusicHandler, held for the whole command so it is never hibernated meanwhile
+      with self.bot.musicHandler(guild_id) as musicHandler:
+         new_mode = musicHandler.toggle_repeat_mode(RepeatMode.ALL)
 
-      await interaction.response.send_message(
-         content=self.bot.locale_manager.get_text(guild_id, new_mode.status_message),
-      )
+         await interaction.response.send_message(
+            content=self.bot.locale_manager.get_text(guild_id, new_mode.status_message),
+         )
 
 # Required setup function for Discord Cogs
 async def setup(bot):
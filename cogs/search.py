@@ -3,7 +3,6 @@ from discord.ext import commands
 from discord import app_commands
 from handler.track import Track
 from utils.utils import extractInfoByTitle, createEmbed
-from handler.music_handler import MusicHandler
 
 class SearchCommand(commands.Cog):
    """
@@ -50,49 +49,42 @@ class SearchCommand(commands.Cog):
 
       voice = interaction.guild.voice_client
       
-      # Get the specific MusicHandler instance associated with this server (guild)
+      # This server's (guild's) MusicHandler, held for the whole command so it is never hibernated meanwhile
       guild_id = interaction.guild.id
-      musicHandler: MusicHandler = await self.bot.getMusicHandler(guild_id)
+      with self.bot.musicHandler(guild_id) as musicHandler:
+         try:
+            # Use the MusicHandler to fetch track metadata from the URL (e.g., via yt-dlp)
+            track: Track = await extractInfoByTitle(title)
+         except Exception as e:
+            # Handle potential errors during information extraction (e.g., video not found/private)
+            await interaction.followup.send(
+               content=self.bot.locale_manager.get_text(guild_id, "common.error", error=str(e)), 
+            )
+            return
       
-      # Ensure playback is not explicitly stopped if a new command is issued
-      musicHandler.stop_flag = False
-      
-      try:
-         # Use the MusicHandler to fetch track metadata from the URL (e.g., via yt-dlp)
-         track: Track = await extractInfoByTitle(title)
-      except Exception as e:
-         # Handle potential errors during information extraction (e.g., video not found/private)
-         await interaction.followup.send(
-            content=self.bot.locale_manager.get_text(guild_id, "common.error", error=str(e)), 
-         )
-         return
-      
-      # --- 3. Add to Queue and Send Confirmation ---
+         # --- 3. Add to Queue and Send Confirmation ---
 
-      # Add the newly extracted track object to the queue
-      musicHandler.add_track(track)
+         # Add the newly extracted track object to the queue
+         track.requester = interaction.user.id
+         musicHandler.add_track(track)
 
-      # Create a rich embed message to confirm the track was added
-      embed = createEmbed(track=track)
+         # Create a rich embed message to confirm the track was added
+         embed = createEmbed(track=track)
 
-      # Mention the user who added the song
-      embed.add_field(
-         name=self.bot.locale_manager.get_text(guild_id, "common.added_by"), 
-         value=f"<@{interaction.user.id}>", 
-         inline=False
-      ) 
+         # Mention the user who added the song
+         embed.add_field(
+            name=self.bot.locale_manager.get_text(guild_id, "common.added_by"), 
+            value=f"<@{interaction.user.id}>", 
+            inline=False
+         ) 
       
-      # Send the confirmation message in the channel
-      await interaction.followup.send(embed=embed)
+         # Send the confirmation message in the channel
+         await interaction.followup.send(embed=embed)
 
-      # --- 4. Start Playback ---
+         # --- 4. Start Playback ---
 
-      # If music is already actively playing (the queue loop is running), we just added to the queue, so we return.
-      if voice.is_playing() or musicHandler.is_playing:
-         return
-      
-      # If nothing was playing, start the playback loop using the MusicHandler's player method
-      await musicHandler.player(voice=voice)
+         # Starts the queue if nothing is playing, otherwise the track just waits its turn
+         await musicHandler.play(voice=voice)
 
 # Required setup function for Discord Cogs
 async def setup(bot):
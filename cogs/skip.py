@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from handler.music_handler import MusicHandler
 
 class SkipCommand(commands.Cog):
    def __init__(self, bot):
@@ -19,26 +18,21 @@ class SkipCommand(commands.Cog):
          )
          return
       
-      # Get the specific MusicHandler instance associated with this server (guild)
-      musicHandler: MusicHandler = await self.bot.getMusicHandler(guild_id)
-      
-      if musicHandler.queue_empty:
+      # This server's (guild's) MusicHandler, held for the whole command so it is never hibernated meanwhile
+      with self.bot.musicHandler(guild_id) as musicHandler:
+         if musicHandler.queue_empty:
+            await interaction.response.send_message(
+               content=self.bot.locale_manager.get_text(guild_id, "skip.queue_empty"), 
+               ephemeral=True # Only the user sees this message
+            )
+            return
+
+         voice = interaction.guild.voice_client
+         # The player task stops the current track and starts the next one
+         await musicHandler.skip(voice=voice)
          await interaction.response.send_message(
-            content=self.bot.locale_manager.get_text(guild_id, "skip.queue_empty"), 
-            ephemeral=True # Only the user sees this message
+            content=self.bot.locale_manager.get_text(guild_id, "skip.skipped"),
          )
-         return
-
-      musicHandler.skip_flag = True
-      
-      voice = interaction.guild.voice_client
-      voice.stop()
-      await interaction.response.send_message(
-         content=self.bot.locale_manager.get_text(guild_id, "skip.skipped"),
-      )
-      if not voice.is_playing() and not musicHandler.is_playing:
-         # If nothing was playing, start the playback loop using the MusicHandler's player method
-         await musicHandler.player(voice=voice)
 
 # Required setup function for Discord Cogs
 async def setup(bot):
@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from handler.music_handler import MusicHandler
 
 class StopCommand(commands.Cog):
    def __init__(self, bot):
@@ -19,24 +18,21 @@ class StopCommand(commands.Cog):
          )
          return
       
-      # Get the specific MusicHandler instance associated with this server (guild)
-      musicHandler: MusicHandler = await self.bot.getMusicHandler(guild_id)
-
-      voice = interaction.guild.voice_client
+      # This server's (guild's) MusicHandler, held for the whole command so it is never hibernated meanwhile
+      with self.bot.musicHandler(guild_id) as musicHandler:
+         # Also true while a track is still being resolved, which /stop cancels
+         if not musicHandler.is_playing:
+            await interaction.response.send_message(
+               content=self.bot.locale_manager.get_text(guild_id, "stop.nothing_playing"), 
+               ephemeral=True # Only the user sees this message
+            )
+            return
+      
+         await musicHandler.stop()
 
-      if not voice.is_playing() or not musicHandler.is_playing:
          await interaction.response.send_message(
-            content=self.bot.locale_manager.get_text(guild_id, "stop.nothing_playing"), 
-            ephemeral=True # Only the user sees this message
+            content=self.bot.locale_manager.get_text(guild_id, "stop.stopped"), 
          )
-         return
-      
-      musicHandler.stop_flag = True
-      voice.stop()
-
-      await interaction.response.send_message(
-         content=self.bot.locale_manager.get_text(guild_id, "stop.stopped"), 
-      )
 
 # Required setup function for Discord Cogs
 async def setup(bot):
@@ -52,7 +52,146 @@ YDL_OPTIONS_FROM_TITLE = {
     },
 }
 
+# Setting up to enumerate playlists: entries are listed flat (id, title, duration)
+# and their streams are resolved only when each track is about to play
+YDL_OPTIONS_PLAYLIST = {
+    "logger": NoWarningLogger(),
+    'noplaylist': False,
+    'extract_flat': 'in_playlist',
+    'lazy_playlist': True,
+    'quiet': True,
+    'nocheckcertificate': True,
+    'ignoreerrors': True, 
+    'cachedir': False,
+    "http_headers": YDL_OPTIONS["http_headers"],
+    "extractor_args": YDL_OPTIONS["extractor_args"],
+}
+
+# Maximum number of entries taken from a single playlist
+PLAYLIST_MAX_ENTRIES = 500
+# Playlist entries listed per worker call. YouTube pages playlists by 100, so listing
+# a page further into the playlist costs one more request than the previous one
+PLAYLIST_PAGE_SIZE = 100
+# Workers reserved for listing playlists, apart from the single-track lookups
+PLAYLIST_WORKERS = 2
+# Seconds one page of a playlist may take to list
+PLAYLIST_PAGE_TIMEOUT = 60
+
 FFMPEG_OPTIONS = {
     'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
     'options': '-vn'
-}
\ No newline at end of file
+}
+
+# "native" demuxes Opus-in-WebM sources in-process without ffmpeg and uses "opus" for the rest.
+# "opus" sends Opus packets straight to Discord: copied from the source when it is
+# already Opus, encoded by ffmpeg otherwise. "pcm" decodes to PCM and lets discord.py
+# encode every frame in Python.
+PLAYBACK_MODE = "native"
+# Bitrate in kbit/s used when ffmpeg has to encode Opus
+OPUS_BITRATE = 128
+
+# Extraction executor: yt-dlp lookups run in this worker pool instead of the event loop
+EXTRACTION_WORKERS = 4
+# Seconds before a single yt-dlp lookup is abandoned
+EXTRACTION_TIMEOUT = 30
+# "thread" runs lookups in worker threads, "process" in worker processes
+# so yt-dlp's parsing does not compete with audio sending for the GIL
+EXTRACTION_BACKEND = "thread"
+# In process mode a worker process is replaced after this many lookups
+EXTRACTION_MAX_JOBS_PER_WORKER = 200
+
+# Track metadata cache (title, author, duration, thumbnail) keyed by video ID
+METADATA_CACHE_PATH = "./data/metadata.sqlite3"
+# Entries older than this many seconds are treated as missing
+METADATA_CACHE_TTL = 7 * 24 * 60 * 60
+# Number of entries kept in the in-memory LRU tier
+METADATA_CACHE_MEMORY_SIZE = 2048
+# Number of entries kept in the on-disk tier
+METADATA_CACHE_DISK_SIZE = 100_000
+
+# Stream url lifecycle: a url is trusted without probing while it stays valid
+# for the track duration plus this many seconds
+STREAM_URL_EXPIRY_MARGIN = 300
+# Number of upcoming queue entries whose stream urls are refreshed in the background
+STREAM_URL_REFRESH_AHEAD = 3
+# Number of most recent history entries kept fresh for /back
+STREAM_URL_REFRESH_HISTORY = 2
+
+# Shared HTTP client used for every outbound request the bot makes
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+# Seconds an idle keep-alive connection is kept open
+HTTP_KEEPALIVE_EXPIRY = 60
+HTTP_TIMEOUT = 10.0
+# Needs the "h2" package (installed through httpx[http2]), falls back to HTTP/1.1 without it
+HTTP2 = True
+
+# /search result cache shared by all guilds, keyed by the normalised query
+SEARCH_CACHE_SIZE = 4096
+SEARCH_CACHE_TTL = 6 * 60 * 60
+
+# Pre-buffering: the opening seconds of the next track are fetched while the current one plays
+PREBUFFER_ENABLED = True
+PREBUFFER_SECONDS = 10
+# Used to turn seconds into bytes, YouTube audio streams are 50-160 kbit/s
+PREBUFFER_ASSUMED_BITRATE = 160_000
+# Memory caps for pre-buffered audio, per guild and for the whole process
+PREBUFFER_GUILD_BYTES = 512 * 1024
+PREBUFFER_GLOBAL_BYTES = 64 * 1024 * 1024
+
+# Skip/back commands arriving within this many seconds of each other are applied
+# as one queue movement, so only the final track is resolved and started
+CONTROL_COALESCE_WINDOW = 0.2
+
+# Mid-track recovery: a track that stops this many seconds or more before its end
+# is restarted from the last position with a freshly resolved stream url
+RECOVERY_END_TOLERANCE = 5
+# Recovery attempts per track before moving on to the next one
+RECOVERY_MAX_ATTEMPTS = 3
+
+# Played tracks kept in memory per guild; older ones are moved to an on-disk archive
+HISTORY_MEMORY_LIMIT = 50
+HISTORY_ARCHIVE_PATH = "./data/history"
+# Tracks kept in a guild's archive, the oldest ones are dropped beyond that
+HISTORY_ARCHIVE_LIMIT = 5000
+
+# Queue, history, current track and repeat mode of every guild are journaled here
+STATE_STORE_PATH = "./data/state.sqlite3"
+# Journal entries per guild after which they are folded into a snapshot
+STATE_JOURNAL_COMPACT_AFTER = 500
+
+# Seconds without commands after which an idle guild's MusicHandler is hibernated
+HANDLER_IDLE_TTL = 900
+# MusicHandlers kept in memory, the least recently used idle ones are hibernated beyond that
+HANDLER_MAX_LIVE = 1000
+# Seconds between checks for idle MusicHandlers
+HANDLER_SWEEP_INTERVAL = 60
+
+# Tracks shown on one page of /queue and /history
+PAGE_SIZE = 10
+# Rendered pages kept across all guilds, keyed by list version and locale
+PAGE_CACHE_SIZE = 512
+# Seconds the page buttons stay active after the last click
+PAGE_VIEW_TIMEOUT = 180
+
+# Worker processes started by main.py. 1 runs the bot in the current process without a supervisor
+CLUSTER_WORKERS = 1
+# Total shards across all workers, None asks Discord for its recommendation
+CLUSTER_SHARD_COUNT = None
+# Seconds between health reports sent by each worker to the supervisor
+CLUSTER_HEALTH_INTERVAL = 15
+# A worker silent for this many seconds is considered hung and restarted
+CLUSTER_HEALTH_TIMEOUT = 120
+# Seconds between aggregated health lines printed by the supervisor
+CLUSTER_REPORT_INTERVAL = 60
+# Longest wait before restarting a worker that keeps crashing, in seconds
+CLUSTER_MAX_RESTART_DELAY = 60
+# Seconds to wait per shard before starting the next worker, Discord allows one login per 5 seconds
+CLUSTER_IDENTIFY_DELAY = 5
+
+# Gateway profile: "full" requests every intent and caches members and messages,
+# "lean" requests only what the cogs use (guilds and voice states) and caches no messages
+INTENTS_PROFILE = "full"
+
+# Hash of the last synced slash command tree; commands are synced only when it changes
+COMMAND_TREE_HASH_PATH = "./data/command_tree.sha256"
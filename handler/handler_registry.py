@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from handler.config import HANDLER_IDLE_TTL, HANDLER_MAX_LIVE, HANDLER_SWEEP_INTERVAL
+
+class HandlerRegistry:
+   """
+   Per-guild MusicHandlers with an idle time to live and a cap on live instances.
+
+   Handlers are kept in least-recently-used order. A handler that is idle past the
+   TTL, or the least recently used idle one once the cap is exceeded, is hibernated:
+   its queue state is snapshotted to the state store and the instance is dropped.
+   The next command in that guild creates a new handler, which restores the state.
+   Handlers that are leased by a running command, playing or connected to voice
+   are never hibernated.
+   """
+   def __init__(self, factory, idle_ttl: float = HANDLER_IDLE_TTL, max_live: int = HANDLER_MAX_LIVE):
+      """
+      Args:
+         factory: Callable creating the handler of a guild from its ID.
+         idle_ttl: Seconds without use after which an idle handler is hibernated.
+         max_live: Handlers kept in memory before idle ones are hibernated early.
+      """
+      self.__factory = factory
+      self.__idle_ttl = idle_ttl
+      self.__max_live = max_live
+      # guild_id -> (handler, last used), least recently used first
+      self.__live: OrderedDict = OrderedDict()
+      self.__hibernated: set[int] = set()
+      # guild_id -> commands currently holding the handler through `lease`
+      self.__leases: dict[int, int] = {}
+      self.__sweeper: asyncio.Task | None = None
+      self.revived = 0
+
+   @property
+   def live_count(self) -> int:
+      return len(self.__live)
+
+   @property
+   def hibernated_count(self) -> int:
+      return len(self.__hibernated)
+
+   def stats(self) -> dict:
+      return {"live": self.live_count, "hibernated": self.hibernated_count, "revived": self.revived}
+
+   def get(self, guild_id: int):
+      """
+      Returns the guild's handler, creating or reviving it on first use.
+      """
+      entry = self.__live.get(guild_id)
+      if entry is not None:
+         handler = entry[0]
+         self.__live.move_to_end(guild_id)
+      else:
+         handler = self.__factory(guild_id)
+         if guild_id in self.__hibernated:
+            self.__hibernated.discard(guild_id)
+            self.revived += 1
+            print(f"Revived MusicHandler for server: {guild_id}")
+         else:
+            print(f"Created MusicHandler for server: {guild_id}")
+         self.__evict_over_cap()
+      self.__live[guild_id] = (handler, time.monotonic())
+      return handler
+
+   @contextmanager
+   def lease(self, guild_id: int):
+      """
+      Holds the guild's handler for the duration of the `with` block, e.g. a command
+      waiting on extraction. A leased handler is never hibernated, so the guild cannot
+      end up with a second handler and player task while the command still uses the first.
+      """
+      handler = self.get(guild_id)
+      self.__leases[guild_id] = self.__leases.get(guild_id, 0) + 1
+      try:
+         yield handler
+      finally:
+         remaining = self.__leases.pop(guild_id) - 1
+         if remaining:
+            self.__leases[guild_id] = remaining
+         # The idle time to live counts from the end of the command
+         entry = self.__live.get(guild_id)
+         if entry is not None and entry[0] is handler:
+            self.__live[guild_id] = (handler, time.monotonic())
+
+   def __idle(self, guild_id: int, handler) -> bool:
+      return not self.__leases.get(guild_id) and handler.idle
+
+   def peek(self, guild_id: int):
+      """
+      Returns the guild's live handler without creating, reviving or touching it.
+      """
+      entry = self.__live.get(guild_id)
+      return entry[0] if entry is not None else None
+
+   def __hibernate(self, guild_id: int) -> None:
+      handler, _ = self.__live.pop(guild_id)
+      if handler.hibernate():
+         self.__hibernated.add(guild_id)
+
+   def __evict_over_cap(self) -> None:
+      """
+      Hibernates the least recently used idle handlers until there is room for one more.
+      """
+      if len(self.__live) < self.__max_live:
+         return
+
+      for guild_id, (handler, _) in list(self.__live.items()):
+         if len(self.__live) < self.__max_live:
+            break
+         if self.__idle(guild_id, handler):
+            self.__hibernate(guild_id)
+
+   def sweep(self) -> int:
+      """
+      Hibernates every idle handler unused for longer than the TTL.
+
+      Returns:
+         The number of handlers hibernated.
+      """
+      deadline = time.monotonic() - self.__idle_ttl
+      expired = [
+         guild_id for guild_id, (handler, last_used) in self.__live.items()
+         if last_used < deadline and self.__idle(guild_id, handler)
+      ]
+      for guild_id in expired:
+         self.__hibernate(guild_id)
+      return len(expired)
+
+   async def __sweep_forever(self, interval: float) -> None:
+      while True:
+         await asyncio.sleep(interval)
+         try:
+            count = self.sweep()
+            if count:
+               print(f"Hibernated {count} idle MusicHandler(s), live: {self.live_count}, hibernated: {self.hibernated_count}")
+         except Exception as e:
+            print(f"Failed to hibernate idle MusicHandlers: {e}")
+
+   def start(self, interval: float = HANDLER_SWEEP_INTERVAL) -> None:
+      """
+      Starts the background sweep. Must be called from the running event loop.
+      """
+      if self.__sweeper is None:
+         self.__sweeper = asyncio.create_task(self.__sweep_forever(interval))
+
+   def close(self) -> None:
+      """
+      Stops the sweep and hibernates every live handler, so their state is snapshotted.
+      """
+      if self.__sweeper is not None:
+         self.__sweeper.cancel()
+         self.__sweeper = None
+      for guild_id in list(self.__live):
+         self.__hibernate(guild_id)
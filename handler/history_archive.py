@@ -0,0 +1,157 @@
+import json
+import os
+from array import array
+from handler.track import Track
+from handler.config import HISTORY_ARCHIVE_PATH, HISTORY_ARCHIVE_LIMIT
+
+class HistoryArchive:
+   """
+   Append-only on-disk archive of a guild's older history entries.
+
+   Each entry is one compact JSON line (title, author, url, duration, thumbnail);
+   stream urls are not stored since they expire anyway. Only the byte offset of every
+   line is kept in memory, so paging and popping the newest entry never read the
+   whole file. The file is opened per operation to keep no descriptors per guild.
+   """
+   def __init__(self, guild_id: int, path: str = HISTORY_ARCHIVE_PATH, limit: int = HISTORY_ARCHIVE_LIMIT):
+      self.__file = os.path.join(path, f"{guild_id}.jsonl")
+      self.__limit = limit
+      self.__offsets: array | None = None
+      self.__durations: array | None = None
+      self.__total_duration = 0
+
+   def __load(self) -> None:
+      """
+      Indexes the archive file on first use.
+      """
+      if self.__offsets is not None:
+         return
+      
+      self.__offsets = array("Q")
+      self.__durations = array("L")
+      self.__total_duration = 0
+      if not os.path.exists(self.__file):
+         return
+      
+      try:
+         with open(self.__file, "rb") as f:
+            offset = 0
+            for line in f:
+               duration = self.__parse(line)[3]
+               self.__offsets.append(offset)
+               self.__durations.append(duration)
+               self.__total_duration += duration
+               offset += len(line)
+      except (OSError, ValueError) as e:
+         print(f"Failed to read history archive {self.__file}: {e}")
+
+   @staticmethod
+   def __parse(line: bytes) -> list:
+      return json.loads(line)
+
+   @staticmethod
+   def __to_track(record: list) -> Track:
+      title, author, url, duration, thumbnail = record
+      return Track(title=title, author=author, url=url, duration=duration, thumbnail=thumbnail)
+
+   def __len__(self) -> int:
+      self.__load()
+      return len(self.__offsets)
+
+   @property
+   def total_duration(self) -> int:
+      self.__load()
+      return self.__total_duration
+
+   def append(self, track: Track) -> None:
+      """
+      Writes a track to the end of the archive.
+      """
+      self.__load()
+      record = [track.title, track.author, track.url, int(track.duration or 0), track.thumbnail]
+      line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+      
+      try:
+         os.makedirs(os.path.dirname(self.__file), exist_ok=True)
+         with open(self.__file, "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(line)
+      except OSError as e:
+         print(f"Failed to write history archive {self.__file}: {e}")
+         return
+      
+      self.__offsets.append(offset)
+      self.__durations.append(record[3])
+      self.__total_duration += record[3]
+
+      # Rewriting drops the oldest entries; it is amortised by letting the file overshoot
+      if len(self.__offsets) > self.__limit + self.__limit // 4:
+         self.__trim()
+
+   def pop(self) -> Track | None:
+      """
+      Removes and returns the newest archived track, or None if the archive is empty.
+      """
+      self.__load()
+      if not self.__offsets:
+         return None
+      
+      offset = self.__offsets[-1]
+      try:
+         with open(self.__file, "r+b") as f:
+            f.seek(offset)
+            record = self.__parse(f.readline())
+            f.truncate(offset)
+      except (OSError, ValueError) as e:
+         print(f"Failed to read history archive {self.__file}: {e}")
+         return None
+      
+      self.__offsets.pop()
+      self.__total_duration -= self.__durations.pop()
+      return self.__to_track(record)
+
+   def read(self, start: int, count: int) -> list:
+      """
+      Reads `count` tracks starting at index `start` (0 is the oldest).
+      """
+      self.__load()
+      stop = min(start + count, len(self.__offsets))
+      if start >= stop:
+         return []
+      
+      tracks = []
+      try:
+         with open(self.__file, "rb") as f:
+            f.seek(self.__offsets[start])
+            for _ in range(stop - start):
+               tracks.append(self.__to_track(self.__parse(f.readline())))
+      except (OSError, ValueError) as e:
+         print(f"Failed to read history archive {self.__file}: {e}")
+      return tracks
+
+   def __trim(self) -> None:
+      drop = len(self.__offsets) - self.__limit
+      try:
+         with open(self.__file, "rb") as f:
+            f.seek(self.__offsets[drop])
+            data = f.read()
+         temp = self.__file + ".tmp"
+         with open(temp, "wb") as f:
+            f.write(data)
+         os.replace(temp, self.__file)
+      except OSError as e:
+         print(f"Failed to trim history archive {self.__file}: {e}")
+         return
+      
+      # Re-index from the rewritten file
+      self.__offsets = None
+      self.__load()
+
+   def clear(self) -> None:
+      try:
+         os.remove(self.__file)
+      except FileNotFoundError:
+         pass
+      self.__offsets = array("Q")
+      self.__durations = array("L")
+      self.__total_duration = 0
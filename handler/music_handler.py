@@ -1,39 +1,124 @@
-from collections import deque
 from .track import Track
-from .config import FFMPEG_OPTIONS
+from .config import (
+   FFMPEG_OPTIONS, 
+   STREAM_URL_REFRESH_AHEAD, 
+   STREAM_URL_REFRESH_HISTORY, 
+   PREBUFFER_ENABLED,
+   PLAYBACK_MODE,
+   OPUS_BITRATE,
+   CONTROL_COALESCE_WINDOW,
+   RECOVERY_END_TOLERANCE,
+   RECOVERY_MAX_ATTEMPTS
+)
+from .prebuffer import Prebuffer, PrebufferedStream
+from .webm import WebMOpusAudio
 from .queue_manager import QueueManager, RepeatMode
-from utils.utils import updateWorkingStreamLink
+from .state_store import state_store
+from .track_list import TrackListView, TrackPage
+from utils.utils import updateWorkingStreamLink, refreshStreamLink, scheduleStreamRefresh
+from collections import deque
+from enum import Enum, auto
 import asyncio
+import time
 import discord
 
+class PlayerEvent(Enum):
+   """
+   Events consumed by the per-guild player task.
+   """
+   ENQUEUE = auto()
+   TRACK_ENDED = auto()
+   SKIP = auto()
+   BACK = auto()
+   STOP = auto()
+
+class PlayerState(Enum):
+   IDLE = auto()
+   STARTING = auto()
+   PLAYING = auto()
+
 class MusicHandler:
    """
    Handles music playback logic, queue management, history tracking, and YouTube info extraction
    for a Discord bot.
+
+   Playback is driven by a long-lived asyncio task per guild that consumes an event queue
+   (track ended, skip, back, stop, enqueue), so commands and the end-of-track callback never
+   race each other: every transition is handled in order on the event loop.
    """
-   def __init__(self, bot):
-      """
-      Initializes the MusicHandler with empty queue_manager and control flags set to False.
+   def __init__(self, bot, guild_id: int):
       """
-      self.__queue_manager = QueueManager()
-      self.__is_playing: bool = False
+      Initializes the MusicHandler in the idle state, restoring the guild's queue
+      from the state journal if it has one.
 
-      # Control flags for stop, skip, and back actions
-      self.__stop_flag: bool = False
-      self.__skip_flag: bool = False
-      self.__back_flag: bool = False
+      Args:
+         bot: The bot instance.
+         guild_id: The guild this handler plays for.
+      """
+      self.__guild_id = guild_id
+      self.__queue_manager = QueueManager(guild_id, store=state_store)
+      self.__state = PlayerState.IDLE
 
       self.__bot = bot
+      self.__voice: discord.VoiceProtocol | None = None
+
+      self.__events: asyncio.Queue = asyncio.Queue()
+      # Events read while collecting a skip/back burst, handled before the queue
+      self.__backlog: deque = deque()
+      self.__task: asyncio.Task | None = None
+      # Incremented on every transition so end-of-track callbacks of replaced sources are ignored
+      self.__play_token = 0
+
+      # Opening seconds of the next track, fetched while the current one plays
+      self.__prebuffer = Prebuffer()
+      # Pre-buffered source of the current track, closed when the track ends
+      self.__stream: PrebufferedStream | None = None
+
+      # Duration of the last transition, from the event to the new source playing
+      self.last_transition_ms: float | None = None
+      self.transitions = 0
+      # Skip/back commands that were folded into another one instead of starting a track
+      self.transitions_saved = 0
+
+      # Playback position of the current track: offset it was started at and when
+      self.__position_offset = 0.0
+      self.__started_at: float | None = None
+      self.__recovery_attempts = 0
+      self.recoveries = 0
+      self.recovery_failures = 0
+      # Silence heard by listeners during the last recoveries, in milliseconds
+      self.recovery_gaps_ms: deque = deque(maxlen=50)
 
    def get_current_track(self) -> Track | None:
       return self.__queue_manager.get_current_track_for_embed()
    
-   def get_queue(self) -> list:
+   def get_queue(self) -> TrackListView:
       return self.__queue_manager.queue
    
-   def get_history(self) -> list:
+   def get_history(self) -> TrackListView:
       return self.__queue_manager.history
 
+   def get_queue_version(self) -> int:
+      return self.__queue_manager.queue_version
+
+   def get_history_version(self) -> tuple:
+      return self.__queue_manager.history_version
+
+   def get_queue_page(self, number: int, size: int = 10) -> TrackPage:
+      return self.__queue_manager.queue_page(number, size)
+
+   def get_history_page(self, number: int, size: int = 10) -> TrackPage:
+      return self.__queue_manager.history_page(number, size)
+
+   def remove_track(self, index: int) -> Track:
+      return self.__queue_manager.remove(index)
+
+   def move_track(self, source: int, destination: int) -> None:
+      self.__queue_manager.move(source, destination)
+
+   def shuffle(self) -> None:
+      self.__queue_manager.shuffle()
+
    def add_track(self, track: Track) -> None:
       """
       Adds a new track to the end of the playback queue.
@@ -63,91 +148,425 @@ class MusicHandler:
 
    @property
    def is_playing(self) -> bool:
-      return self.__is_playing
+      return self.__state != PlayerState.IDLE
 
    @property
-   def back_flag(self) -> bool:
-      return self.__back_flag
-   
-   @back_flag.setter
-   def back_flag(self, flag: bool):
-      self.__back_flag = flag
-   
+   def idle(self) -> bool:
+      """
+      Nothing is playing, no event is waiting and the bot is not in a voice channel
+      of the guild, so the handler can be hibernated without anyone noticing.
+
+      The guild's own voice client is checked, not the one last passed to this handler,
+      which is unknown until a command posts its first event.
+      Commands still running are tracked by the registry's leases.
+      """
+      if self.__state != PlayerState.IDLE or not self.__events.empty() or self.__backlog:
+         return False
+      guild = self.__bot.get_guild(self.__guild_id)
+      voice = guild.voice_client if guild is not None else self.__voice
+      return voice is None or not voice.is_connected()
+
    @property
-   def skip_flag(self) -> bool:
-      return self.__skip_flag
-   
-   @skip_flag.setter
-   def skip_flag(self, flag: bool):
-      self.__skip_flag = flag
+   def state(self) -> PlayerState:
+      return self.__state
 
    @property
-   def stop_flag(self) -> bool:
-      return self.__stop_flag
+   def position(self) -> float:
+      """
+      Seconds played of the current track, 0 when nothing is playing.
+      """
+      if self.__started_at is None:
+         return 0.0
+      return self.__position_offset + time.monotonic() - self.__started_at
 
-   @stop_flag.setter
-   def stop_flag(self, flag: bool):
-     self.__stop_flag = flag
+   @property
+   def recovery_stats(self) -> dict:
+      gaps = self.recovery_gaps_ms
+      return {
+         "recoveries": self.recoveries,
+         "failures": self.recovery_failures,
+         "last_gap_ms": gaps[-1] if gaps else None,
+         "average_gap_ms": sum(gaps) / len(gaps) if gaps else None,
+      }
 
-   async def player(self, voice: discord.VoiceProtocol):
+   async def play(self, voice: discord.VoiceProtocol) -> None:
       """
-      Main playback control loop.
-
-      Manages the state machine for playing, skipping, and going back based on internal flags
-      and queue status. It calls the `__play` method internally to stream audio.
+      Starts playback of the queue if nothing is playing. Call after adding tracks.
 
       Args:
-         voice: The Discord voice client needed to pass to `__play` for audio transmission.
+         voice: The Discord voice client used for audio transmission.
+      """
+      self.__post(PlayerEvent.ENQUEUE, voice)
+
+   async def skip(self, voice: discord.VoiceProtocol) -> None:
+      """
+      Skips to the next track, ignoring repeat of the current track.
+      """
+      self.__post(PlayerEvent.SKIP, voice)
+
+   async def back(self, voice: discord.VoiceProtocol) -> None:
+      """
+      Returns to the previous track from history.
+      """
+      self.__post(PlayerEvent.BACK, voice)
+
+   async def stop(self) -> None:
+      """
+      Stops playback and moves the current track to history.
+      """
+      self.__post(PlayerEvent.STOP)
+
+   def shutdown(self) -> None:
       """
-      self.__is_playing = True
+      Cancels the player task. Pending events are dropped.
+      """
+      if self.__task is not None:
+         self.__task.cancel()
+         self.__task = None
+      self.__prebuffer.discard()
+      self.__close_stream()
+
+   def hibernate(self) -> bool:
+      """
+      Snapshots the queue state and releases the player task and buffers.
+      A new handler for the same guild restores the state from the journal.
+
+      Returns:
+         True if the guild had state worth restoring.
+      """
+      has_state = self.__queue_manager.has_state
+      if has_state:
+         self.__queue_manager.persist()
+      self.shutdown()
+      return has_state
+
+   def __post(self, event: PlayerEvent, voice: discord.VoiceProtocol | None = None, payload=None) -> None:
+      """
+      Queues an event for the player task, starting the task on first use.
+      """
+      if voice is not None:
+         self.__voice = voice
+      
+      if self.__task is None or self.__task.done():
+         self.__task = asyncio.create_task(self.__run())
+      
+      self.__events.put_nowait((event, payload, time.perf_counter()))
 
-      if self.__stop_flag:
-         self.__stop_flag = False
-         self.__is_playing = False
+   def __on_track_end(self, token: int, error: Exception | None) -> None:
+      """
+      Called by discord.py from its audio thread when a source finishes.
+      """
+      # The position is taken now, before the event waits in the queue
+      self.__bot.loop.call_soon_threadsafe(
+         self.__events.put_nowait, 
+         (PlayerEvent.TRACK_ENDED, (token, error, self.position), time.perf_counter())
+      )
+
+   async def __run(self) -> None:
+      """
+      The player task: handles events one at a time for the lifetime of the handler.
+      """
+      while True:
+         if self.__backlog:
+            event, payload, posted_at = self.__backlog.popleft()
+         else:
+            event, payload, posted_at = await self.__events.get()
+         try:
+            if event in (PlayerEvent.SKIP, PlayerEvent.BACK):
+               await self.__handle_moves(event, posted_at)
+            else:
+               await self.__handle(event, payload, posted_at)
+         except asyncio.CancelledError:
+            raise
+         except Exception as e:
+            print(f"Error handling player event {event.name}: {e}")
+            self.__state = PlayerState.IDLE
+
+   async def __handle(self, event: PlayerEvent, payload, posted_at: float) -> None:
+      """
+      State machine of the player.
+
+      IDLE -> PLAYING on ENQUEUE; PLAYING -> next track on TRACK_ENDED; any state -> IDLE
+      on STOP or when the queue runs out. SKIP and BACK go through `__handle_moves`.
+      """
+      if event == PlayerEvent.STOP:
+         self.__halt()
+         self.__prebuffer.discard()
          self.__queue_manager.clear_current()
          return
       
+      if event == PlayerEvent.TRACK_ENDED:
+         token, error, position = payload
+         if token != self.__play_token or self.__state != PlayerState.PLAYING:
+            # Callback of a source that was already replaced or stopped
+            return
+         if error:
+            print(f"Playback error: {error}")
+         if not self.__connected:
+            # Kicked or disconnected: nothing can play, so neither resume nor consume the queue
+            self.__halt()
+            return
+         if await self.__recover(error, position, posted_at):
+            return
+         await self.__start(self.__queue_manager.next_track(), posted_at)
+         return
+      
+      if event == PlayerEvent.ENQUEUE:
+         if self.__state == PlayerState.IDLE:
+            await self.__start(self.__queue_manager.next_track(), posted_at)
+         return
+
+   async def __handle_moves(self, first: PlayerEvent, posted_at: float) -> None:
+      """
+      Collects a burst of skip/back commands and applies it as a single transition.
+
+      The current track is silenced at once, then further skip/back events arriving within
+      CONTROL_COALESCE_WINDOW are folded in. The queue is moved once per command, which
+      is cheap, but only the final target track is resolved and started. A command arriving
+      while that track is still being resolved abandons it and starts a new burst.
+      """
+      self.__halt()
+      moves = [first]
+      loop = asyncio.get_running_loop()
+      deadline = loop.time() + CONTROL_COALESCE_WINDOW
+
+      while True:
+         remaining = deadline - loop.time()
+         if remaining <= 0:
+            break
+         try:
+            item = await asyncio.wait_for(self.__events.get(), timeout=remaining)
+         except asyncio.TimeoutError:
+            break
+
+         if item[0] in (PlayerEvent.SKIP, PlayerEvent.BACK):
+            moves.append(item[0])
+            # Every new command extends the burst
+            deadline = loop.time() + CONTROL_COALESCE_WINDOW
+         elif item[0] == PlayerEvent.TRACK_ENDED and item[1][0] != self.__play_token:
+            # Stopping the silenced source fires its end callback, which must not end the burst
+            continue
+         else:
+            # Anything else ends the burst and is handled right after it
+            self.__backlog.append(item)
+            break
+
       track = None
+      for move in moves:
+         if move == PlayerEvent.SKIP:
+            track = self.__queue_manager.next_track(force_skip=True)
+         else:
+            track = self.__queue_manager.back_track()
+      
+      if len(moves) > 1:
+         self.transitions_saved += len(moves) - 1
+         print(f"Coalesced {len(moves)} skip/back commands into one transition")
+      await self.__start(track, posted_at)
 
-      if self.__skip_flag:
-         self.__skip_flag = False
-         track = self.__queue_manager.next_track(force_skip=True)
+   async def __recover(self, error: Exception | None, position: float, posted_at: float) -> bool:
+      """
+      Restarts the current track at the last position if it stopped before its end,
+      typically because the stream url expired or the connection dropped.
 
-      elif self.__back_flag:
-         self.__back_flag = False
-         track = self.__queue_manager.back_track()
+      Args:
+         error: Error reported by discord.py for the finished source, if any.
+         position: Playback position at which the source finished.
+         posted_at: perf_counter timestamp of the end event, used to measure the gap.
 
-      else:
-         track = self.__queue_manager.next_track()
+      Returns:
+         True if playback was resumed, False to move on to the next track.
+      """
+      track = self.__queue_manager.get_current_track_for_embed()
+      ended_early = track.duration and position < track.duration - RECOVERY_END_TOLERANCE
 
-      if not track or track.empty:
-         self.__is_playing = False
-         return
+      if track.empty or not (error or ended_early) or not self.__connected:
+         return False
+      if self.__recovery_attempts >= RECOVERY_MAX_ATTEMPTS:
+         self.recovery_failures += 1
+         print(f"Giving up recovering {track.url} after {self.__recovery_attempts} attempts")
+         return False
+      
+      self.__recovery_attempts += 1
+      print(f"Stream of {track.url} stopped at {position:.0f}s, resuming")
+      try:
+         await refreshStreamLink(track)
+      except Exception as e:
+         print(f"Failed to re-resolve {track.url}: {e}")
+         self.recovery_failures += 1
+         return False
+      
+      if not await self.__start(track, posted_at, position=position):
+         self.recovery_failures += 1
+         return False
+      
+      self.recoveries += 1
+      self.recovery_gaps_ms.append((time.perf_counter() - posted_at) * 1000)
+      return True
+
+   @property
+   def __connected(self) -> bool:
+      return self.__voice is not None and self.__voice.is_connected()
 
+   def __halt(self) -> None:
+      """
+      Stops the current source without triggering a transition.
+      """
+      self.__play_token += 1
+      voice = self.__voice
+      if voice is not None and (voice.is_playing() or voice.is_paused()):
+         voice.stop()
+      self.__close_stream()
+      self.__state = PlayerState.IDLE
+      self.__started_at = None
+
+   async def __start(self, track: Track | None, posted_at: float, position: float = 0.0) -> bool:
+      """
+      Replaces whatever is playing with `track`, or goes idle when there is no track.
+
+      Args:
+         track: The track selected by the queue manager.
+         posted_at: perf_counter timestamp of the event, used to measure transition latency.
+         position: Seconds into the track to start from. Non-zero only when recovering,
+            in which case the stream url has just been resolved.
+
+      Returns:
+         True if the track started playing.
+      """
+      self.__halt()
+
+      voice = self.__voice
+      if not track or track.empty or not self.__connected:
+         return False
+      
+      self.__state = PlayerState.STARTING
       try:
-         self.__queue_manager.current_track = await updateWorkingStreamLink(track)
-         # Get the current track and start playback
-         await self.__play(track=self.__queue_manager.current_track, voice=voice)
+         stream = None
+         if not position:
+            self.__recovery_attempts = 0
+            # The buffer is only handed over while its stream url stays valid for the whole track,
+            # otherwise the url is checked and refreshed as for any other track
+            stream = self.__prebuffer.take(track, self.__bot.loop) if PREBUFFER_ENABLED else None
+            if stream is None:
+               track = await self.__resolve(track)
+               if track is None:
+                  self.__state = PlayerState.IDLE
+                  return False
+         self.__queue_manager.current_track = track
+
+         source = await self.__create_source(track, stream, position)
+         token = self.__play_token
+         voice.play(source, after=lambda e: self.__on_track_end(token, e))
       except Exception as e:
-         print(f"Error updating track: {e}")
+         print(f"Error during audio playback: {e}")
+         self.__state = PlayerState.IDLE
+         return False
+      
+      self.__position_offset = position
+      self.__started_at = time.monotonic()
+      self.__state = PlayerState.PLAYING
+      self.transitions += 1
+      self.last_transition_ms = (time.perf_counter() - posted_at) * 1000
+
+      upcoming = self.__queue_manager.upcoming(STREAM_URL_REFRESH_AHEAD)
+      if PREBUFFER_ENABLED and upcoming:
+         self.__prebuffer.prepare(upcoming[0])
+      # Keep the next tracks and the recent history playable without a refresh at start
+      scheduleStreamRefresh(
+         upcoming + self.__queue_manager.recent_history(STREAM_URL_REFRESH_HISTORY)
+      )
+      return True
+
+   async def __resolve(self, track: Track) -> Track | None:
+      """
+      Checks the stream url of `track` while watching the event queue, so a skip, back
+      or stop sent during a slow resolution takes over at once instead of after it.
+
+      Returns:
+         The track with a working stream url, or None if a skip, back or stop arrived
+         first. That event is handled next; other events are kept for later in order.
+      """
+      resolving = asyncio.ensure_future(updateWorkingStreamLink(track))
+      getter = None
+      try:
+         while True:
+            getter = asyncio.ensure_future(self.__events.get())
+            done, _ = await asyncio.wait({resolving, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+               return resolving.result()
+            
+            item = getter.result()
+            if item[0] in (PlayerEvent.SKIP, PlayerEvent.BACK, PlayerEvent.STOP):
+               print(f"{item[0].name} cancelled starting {track.url}")
+               self.__backlog.appendleft(item)
+               return None
+            self.__backlog.append(item)
+      finally:
+         # The resolution itself is shared and shielded, so it still completes for the next start
+         resolving.cancel()
+         if getter is not None:
+            getter.cancel()
 
+   def __close_stream(self) -> None:
+      if self.__stream is not None:
+         self.__stream.close()
+         self.__stream = None
 
-   async def __play(self, track: Track, voice: discord.VoiceProtocol):
+
+   async def __create_source(self, track: Track, stream: PrebufferedStream | None, position: float = 0.0) -> discord.AudioSource:
       """
-      Internal helper method to initiate audio playback in a Discord voice channel.
+      Builds the audio source for a track according to PLAYBACK_MODE.
 
-      Uses FFMPEG to stream the audio source. Sets up a lambda callback function to automatically
-      call `player()` again once the current track finishes, unless the stop flag is set.
+      In "native" mode an Opus-in-WebM source is demuxed in-process and its packets are
+      sent as they are, without an ffmpeg subprocess. In "opus" mode an Opus source is
+      copied packet by packet by ffmpeg, and other codecs are encoded to Opus by ffmpeg.
+      Either way discord.py does not have to encode PCM frames itself.
 
       Args:
-         track: The current track object to retrieve the stream_url from.
-         voice: The Discord voice channel object for sending audio.
+         track: The track to play.
+         stream: Pre-buffered stream to read instead of opening the stream url.
+         position: Seconds to seek to. Seeking is done by ffmpeg, so it bypasses the
+            in-process demuxer.
+      """
+      if PLAYBACK_MODE == "native" and track.codec == "opus" and not position:
+         audio = await self.__create_native_source(track, stream)
+         if audio is not None:
+            return audio
+         # The pre-buffered bytes were consumed by the failed attempt
+         stream = None
+
+      if stream is not None:
+         self.__stream = stream
+         source, options = stream, {"pipe": True, "options": FFMPEG_OPTIONS['options']}
+      else:
+         source, options = track.stream_url, dict(FFMPEG_OPTIONS)
+         if position:
+            options['before_options'] = f"-ss {position:.2f} " + options['before_options']
+
+      if PLAYBACK_MODE == "pcm":
+         return discord.FFmpegPCMAudio(source, **options)
+      
+      codec = "copy" if track.codec == "opus" else None
+      return discord.FFmpegOpusAudio(source, codec=codec, bitrate=OPUS_BITRATE, **options)
+
+   async def __create_native_source(self, track: Track, stream: PrebufferedStream | None) -> WebMOpusAudio | None:
       """
+      Opens an in-process WebM demuxer over the stream.
+
+      Returns:
+         The audio source, or None if the stream could not be demuxed in-process.
+      """
+      if stream is None:
+         stream = PrebufferedStream(b"", 0, track.stream_url, self.__bot.loop)
       
+      audio = WebMOpusAudio(stream)
       try:
-         source = discord.FFmpegPCMAudio(track.stream_url, **FFMPEG_OPTIONS)
-         voice.play(source, after=lambda e: asyncio.run_coroutine_threadsafe(
-            self.player(voice), self.__bot.loop
-         ))
+         # Reading the header blocks on the network, which is served by this loop
+         await self.__bot.loop.run_in_executor(None, audio.open)
       except Exception as e:
-         print(f"Error during audio playback: {e}")
\ No newline at end of file
+         # Not Opus in WebM, a malformed header or a failed request: ffmpeg copes or reports it
+         print(f"Falling back to ffmpeg for {track.url}: {e}")
+         stream.close()
+         return None
+      
+      self.__stream = stream
+      return audio
@@ -0,0 +1,261 @@
+import asyncio
+import threading
+from .track import Track
+from .config import (
+   PREBUFFER_SECONDS,
+   PREBUFFER_ASSUMED_BITRATE,
+   PREBUFFER_GUILD_BYTES,
+   PREBUFFER_GLOBAL_BYTES
+)
+from utils.http_client import http_client
+from utils.utils import updateWorkingStreamLink, stream_url_manager
+
+class PrebufferBudget:
+   """
+   Process-wide cap on the memory used by pre-buffered audio.
+   """
+   def __init__(self, limit: int = PREBUFFER_GLOBAL_BYTES):
+      self.__limit = limit
+      self.__used = 0
+      # Released from discord.py's audio threads, reserved from the event loop
+      self.__lock = threading.Lock()
+
+   @property
+   def used(self) -> int:
+      return self.__used
+
+   def reserve(self, size: int) -> int:
+      """
+      Reserves up to `size` bytes.
+
+      Returns:
+         The number of bytes granted, possibly 0 when the budget is exhausted.
+      """
+      with self.__lock:
+         granted = max(0, min(size, self.__limit - self.__used))
+         self.__used += granted
+         return granted
+
+   def release(self, size: int) -> None:
+      with self.__lock:
+         self.__used = max(0, self.__used - size)
+
+prebuffer_budget = PrebufferBudget()
+
+class PrebufferedStream:
+   """
+   File-like audio source that serves the pre-buffered opening bytes first and
+   then continues with the rest of the stream fetched over the shared HTTP client.
+   With an empty head it simply streams the url.
+
+   `read` is called by discord.py's ffmpeg pipe writer thread, so network reads are
+   scheduled on the bot's event loop and awaited from that thread.
+   """
+   CHUNK_SIZE = 64 * 1024
+   READ_TIMEOUT = 30
+
+   def __init__(self, head: bytes, reserved: int, stream_url: str, loop: asyncio.AbstractEventLoop):
+      """
+      Args:
+         head: Opening bytes of the stream.
+         reserved: Bytes of the budget held by `head`, released once it is consumed.
+         stream_url: Stream url used to fetch the remainder.
+         loop: The bot's event loop.
+      """
+      self.__head = memoryview(head)
+      self.__reserved = reserved
+      self.__position = 0
+      self.__offset = len(head)
+      self.__stream_url = stream_url
+      self.__loop = loop
+      self.__response = None
+      self.__chunks = None
+      self.__pending = b""
+      self.__closed = False
+      # Open the remainder right away so it is ready when the head runs out
+      self.__opening = asyncio.run_coroutine_threadsafe(self.__open_rest(), loop)
+
+   async def __open_rest(self) -> None:
+      request = http_client.client.build_request(
+         "GET", self.__stream_url, headers={"Range": f"bytes={self.__offset}-"}
+      )
+      response = await http_client.client.send(request, stream=True)
+      self.__response = response
+      if self.__closed:
+         # Closed while the request was in flight, after `close` looked for a response
+         await response.aclose()
+         return
+      if response.status_code not in (200, 206):
+         await response.aclose()
+         raise IOError(f"Stream request failed with status {response.status_code}")
+      
+      self.__chunks = response.aiter_raw(self.CHUNK_SIZE)
+      if response.status_code == 200:
+         # The server ignored the range, skip the bytes already served from memory
+         await self.__skip(self.__offset)
+
+   async def __skip(self, count: int) -> None:
+      while count > 0:
+         chunk = await self.__chunks.__anext__()
+         if len(chunk) > count:
+            self.__pending = chunk[count:]
+            return
+         count -= len(chunk)
+
+   async def __next_chunk(self) -> bytes:
+      if self.__pending:
+         pending, self.__pending = self.__pending, b""
+         return pending
+      try:
+         return await self.__chunks.__anext__()
+      except StopAsyncIteration:
+         return b""
+
+   def read(self, size: int = -1) -> bytes:
+      if self.__closed:
+         return b""
+
+      if self.__position < len(self.__head):
+         size = len(self.__head) - self.__position if size < 0 else size
+         data = bytes(self.__head[self.__position:self.__position + size])
+         self.__position += len(data)
+         if self.__position >= len(self.__head):
+            self.__release_head()
+         return data
+
+      try:
+         self.__opening.result(timeout=self.READ_TIMEOUT)
+         return asyncio.run_coroutine_threadsafe(
+            self.__next_chunk(), self.__loop
+         ).result(timeout=self.READ_TIMEOUT)
+      except Exception as e:
+         print(f"Pre-buffered stream error: {e}")
+         return b""
+
+   def __release_head(self) -> None:
+      self.__head = memoryview(b"")
+      self.__position = 0
+      if self.__reserved:
+         prebuffer_budget.release(self.__reserved)
+         self.__reserved = 0
+
+   def close(self) -> None:
+      """
+      Releases the buffer and closes the HTTP response. Safe to call from any thread.
+      """
+      if self.__closed:
+         return
+      self.__closed = True
+      self.__release_head()
+      self.__opening.cancel()
+      if self.__response is not None:
+         asyncio.run_coroutine_threadsafe(self.__response.aclose(), self.__loop)
+
+class Prebuffer:
+   """
+   Per-guild pre-buffering stage: resolves the next track and fetches its
+   opening seconds while the current track is playing.
+   """
+   def __init__(
+         self, 
+         seconds: float = PREBUFFER_SECONDS, 
+         bitrate: int = PREBUFFER_ASSUMED_BITRATE,
+         guild_limit: int = PREBUFFER_GUILD_BYTES
+      ):
+      self.__target = min(int(seconds * bitrate / 8), guild_limit)
+      self.__task: asyncio.Task | None = None
+      self.__track: Track | None = None
+      self.__stream_url = ""
+      self.__head = b""
+      self.__reserved = 0
+      self.hits = 0
+      self.misses = 0
+
+   def prepare(self, track: Track | None) -> None:
+      """
+      Starts pre-buffering `track` in the background, dropping any previous buffer.
+      """
+      if track is not None and track is self.__track:
+         return
+      
+      self.discard()
+      if track is None or track.empty:
+         return
+      
+      self.__track = track
+      self.__task = asyncio.create_task(self.__fill(track))
+
+   async def __fill(self, track: Track) -> None:
+      reserved = prebuffer_budget.reserve(self.__target)
+      if not reserved:
+         return
+      
+      buffer = bytearray()
+      try:
+         await updateWorkingStreamLink(track)
+         async with http_client.stream(
+            "GET", track.stream_url, headers={"Range": f"bytes=0-{reserved - 1}"}
+         ) as response:
+            if response.status_code not in (200, 206):
+               raise IOError(f"status {response.status_code}")
+            async for chunk in response.aiter_raw():
+               buffer.extend(chunk[:reserved - len(buffer)])
+               if len(buffer) >= reserved:
+                  break
+      except asyncio.CancelledError:
+         prebuffer_budget.release(reserved)
+         raise
+      except Exception as e:
+         print(f"Failed to pre-buffer {track.url}: {e}")
+         prebuffer_budget.release(reserved)
+         return
+
+      # Give back the part of the reservation a short track did not need
+      prebuffer_budget.release(reserved - len(buffer))
+      self.__stream_url = track.stream_url
+      self.__head = bytes(buffer)
+      self.__reserved = len(buffer)
+
+   def take(self, track: Track, loop: asyncio.AbstractEventLoop) -> PrebufferedStream | None:
+      """
+      Hands over the buffer if it belongs to `track`, is complete and its stream url
+      is still valid until the track ends.
+
+      The buffer may have been filled long before, when the previous track started, so a url
+      that expired or whose expiry is unknown is not trusted for the rest of the stream.
+
+      Returns:
+         A stream serving the buffered bytes followed by the live stream, or None.
+      """
+      if (
+         track is not self.__track 
+         or not self.__head 
+         or self.__stream_url != track.stream_url
+         or stream_url_manager.is_fresh(track) is not True
+      ):
+         self.misses += 1
+         self.discard()
+         return None
+      
+      stream = PrebufferedStream(self.__head, self.__reserved, self.__stream_url, loop)
+      # Ownership of the buffer and its reservation moves to the stream
+      self.__head = b""
+      self.__reserved = 0
+      self.__track = None
+      self.__task = None
+      self.hits += 1
+      return stream
+
+   def discard(self) -> None:
+      """
+      Cancels a pending fill and frees the buffer.
+      """
+      if self.__task is not None and not self.__task.done():
+         self.__task.cancel()
+      self.__task = None
+      self.__track = None
+      self.__stream_url = ""
+      self.__head = b""
+      if self.__reserved:
+         prebuffer_budget.release(self.__reserved)
+         self.__reserved = 0
@@ -1,5 +1,9 @@
-from collections import deque
+from itertools import islice
 from handler.track import Track
+from handler.track_list import TrackList, TrackListView, TrackPage
+from handler.history_archive import HistoryArchive
+from handler.state_store import StateStore
+from handler.config import HISTORY_MEMORY_LIMIT, STATE_JOURNAL_COMPACT_AFTER
 from enum import Enum, auto
 
 class RepeatMode(Enum):
@@ -18,11 +22,127 @@ class RepeatMode(Enum):
 
 class QueueManager:
 
-   def __init__(self):
+   def __init__(self, guild_id: int, history_limit: int = HISTORY_MEMORY_LIMIT, store: StateStore | None = None):
+      """
+      Args:
+         guild_id: The guild the queue belongs to, used to name its history archive.
+         history_limit: Played tracks kept in memory before older ones are archived to disk.
+         store: Journal the state is restored from and every mutation is recorded to.
+      """
+      self.__guild_id = guild_id
       self.__current_track = Track()
-      self.__queue = deque()
-      self.__history = deque()
+      self.__queue = TrackList()
+      self.__history = TrackList()
+      self.__history_limit = history_limit
+      self.__archive = HistoryArchive(guild_id)
       self.__repeat_mode = RepeatMode.NONE
+      self.__store = store
+      self.__journaled = 0
+      if store is not None:
+         self.__restore()
+
+   @staticmethod
+   def __encode(track: Track) -> list | None:
+      if track.empty:
+         return None
+      return [track.title, track.author, track.url, track.duration, track.thumbnail, track.requester]
+
+   @staticmethod
+   def __decode(record: list | None) -> Track:
+      if record is None:
+         return Track()
+      title, author, url, duration, thumbnail, requester = record
+      return Track(title=title, author=author, url=url, duration=duration, thumbnail=thumbnail, requester=requester)
+
+   def __record(self, op: str, payload=None) -> None:
+      """
+      Journals one mutation, folding the journal into a snapshot once it grows long.
+      """
+      if self.__store is None:
+         return
+      self.__store.record(self.__guild_id, op, payload)
+      self.__journaled += 1
+      if self.__journaled >= STATE_JOURNAL_COMPACT_AFTER:
+         self.__compact()
+
+   def __compact(self) -> None:
+      if self.__store is None:
+         return
+      self.__store.compact(self.__guild_id, {
+         "current": self.__encode(self.__current_track),
+         "queue": [self.__encode(track) for track in self.__queue],
+         "history": [self.__encode(track) for track in self.__history],
+         "repeat": self.__repeat_mode.name
+      })
+      self.__journaled = 0
+
+   def __replay(self, op: str, payload) -> None:
+      """
+      Applies one journaled mutation. History overflow is dropped rather than
+      archived again, the archive already holds those tracks.
+      """
+      if op == "queue_append":
+         self.__queue.append(self.__decode(payload))
+      elif op == "queue_popleft":
+         self.__queue.popleft()
+      elif op == "queue_remove":
+         self.__queue.remove(payload)
+      elif op == "queue_move":
+         self.__queue.move(*payload)
+      elif op == "history_push":
+         self.__history.append(self.__decode(payload))
+         while len(self.__history) > self.__history_limit:
+            self.__history.popleft()
+      elif op == "history_pop":
+         if self.__history:
+            self.__history.pop()
+      elif op == "current":
+         self.__current_track = self.__decode(payload)
+      elif op == "repeat":
+         self.__repeat_mode = RepeatMode[payload]
+
+   def __restore(self) -> None:
+      """
+      Rebuilds the state from the latest snapshot and the journal after it.
+      A track that was playing is put back at the front of the queue.
+      """
+      state, ops = self.__store.load(self.__guild_id)
+      if state is None and not ops:
+         return
+      
+      try:
+         if state is not None:
+            self.__current_track = self.__decode(state["current"])
+            self.__queue = TrackList(self.__decode(record) for record in state["queue"])
+            self.__history = TrackList(self.__decode(record) for record in state["history"])
+            self.__repeat_mode = RepeatMode[state["repeat"]]
+         for op, payload in ops:
+            self.__replay(op, payload)
+      except (KeyError, IndexError, TypeError, ValueError) as e:
+         print(f"Discarding unreadable journal of guild {self.__guild_id}: {e}")
+      
+      if not self.__current_track.empty:
+         self.__queue.appendleft(self.__current_track)
+         self.__current_track = Track()
+      
+      self.__compact()
+      print(f"Restored {len(self.__queue)} queued tracks for server: {self.__guild_id}")
+
+   @property
+   def has_state(self) -> bool:
+      """
+      Whether there is anything worth restoring. The archived history stays on disk regardless.
+      """
+      return (
+         not self.__current_track.empty or bool(self.__queue) or bool(self.__history)
+         or self.__repeat_mode != RepeatMode.NONE
+      )
+
+   def persist(self) -> None:
+      """
+      Folds the journal into a snapshot, so reviving the guild replays nothing.
+      """
+      self.__compact()
 
    def add_track(self, track: Track) -> None:
       """
@@ -32,6 +152,7 @@ class QueueManager:
          track: The Track object to add.
       """
       self.__queue.append(track)
+      self.__record("queue_append", self.__encode(track))
 
    @property
    def repeat_mode(self) -> RepeatMode:
@@ -40,6 +161,7 @@ class QueueManager:
    @repeat_mode.setter
    def repeat_mode(self, mode: RepeatMode):
       self.__repeat_mode = mode
+      self.__record("repeat", mode.name)
 
    @property
    def queue_empty(self) -> bool:
@@ -47,7 +169,7 @@ class QueueManager:
    
    @property
    def history_empty(self) -> bool:
-      return len(self.__history) == 0
+      return len(self.__history) == 0 and len(self.__archive) == 0
    
    @property
    def queue_size(self) -> int:
@@ -55,7 +177,7 @@ class QueueManager:
 
    @property
    def history_size(self) -> int:
-      return len(self.__history)
+      return len(self.__archive) + len(self.__history)
    
    @property
    def current_track(self) -> Track:
@@ -75,20 +197,124 @@ class QueueManager:
    
    @current_track.setter
    def current_track(self, track: Track):
-      self.__current_track = track
+      self.__set_current(track)
 
    @property
-   def queue(self) -> list:
-      return list(self.__queue)
+   def queue(self) -> TrackListView:
+      """
+      Read-only view of the queue. Does not copy the tracks.
+      """
+      return TrackListView(self.__queue)
    
    @property
-   def history(self) -> list:
-      return list(self.__history)
+   def history(self) -> TrackListView:
+      """
+      Read-only view of the in-memory part of the history, oldest track first.
+      Archived tracks are only reachable through `history_page`.
+      """
+      return TrackListView(self.__history)
+
+   @property
+   def queue_version(self) -> int:
+      return self.__queue.version
+
+   @property
+   def history_version(self) -> tuple:
+      # Popping an archived track leaves the in-memory list untouched, so the archive size is part of the version
+      return self.__history.version, len(self.__archive)
+
+   def queue_page(self, number: int, size: int = 10) -> TrackPage:
+      return self.__queue.page(number, size)
+
+   def history_page(self, number: int, size: int = 10) -> TrackPage:
+      """
+      Returns one page of the whole history, archived tracks first.
+      Only the archived tracks on the requested page are read from disk.
+      """
+      archived = len(self.__archive)
+      total = archived + len(self.__history)
+      pages = max(1, -(-total // size))
+      number = min(max(number, 0), pages - 1)
+      start = number * size
+      stop = min(start + size, total)
+
+      items = []
+      if start < archived:
+         items.extend(self.__archive.read(start, min(stop, archived) - start))
+      if stop > archived:
+         items.extend(self.__history[max(start - archived, 0):stop - archived])
+      
+      return TrackPage(
+         items=tuple(items),
+         start=start,
+         page=number,
+         pages=pages,
+         total=total,
+         total_duration=self.__archive.total_duration + self.__history.total_duration
+      )
+
+   def remove(self, index: int) -> Track:
+      """
+      Removes the track at `index` from the queue.
+      """
+      track = self.__queue.remove(index)
+      self.__record("queue_remove", index)
+      return track
+
+   def move(self, source: int, destination: int) -> None:
+      """
+      Moves a queued track from one position to another.
+      """
+      self.__queue.move(source, destination)
+      self.__record("queue_move", [source, destination])
+
+   def shuffle(self) -> None:
+      # A new order touches every position, a snapshot is cheaper than journaling it
+      self.__queue.shuffle()
+      self.__compact()
+
+   def upcoming(self, count: int) -> list:
+      """
+      Returns up to `count` tracks from the front of the queue without copying the whole queue.
+      """
+      return self.__queue[:count]
+
+   def recent_history(self, count: int) -> list:
+      """
+      Returns up to `count` most recently played tracks, newest first.
+      """
+      return list(islice(reversed(self.__history), count))
+
+   def __push_history(self, track: Track) -> None:
+      """
+      Appends a played track to the history, spilling the oldest in-memory
+      entries to the on-disk archive once the memory limit is reached.
+      """
+      self.__history.append(track)
+      self.__record("history_push", self.__encode(track))
+      while len(self.__history) > self.__history_limit:
+         self.__archive.append(self.__history.popleft())
+
+   def __pop_history(self) -> Track | None:
+      """
+      Removes the most recently played track, reaching into the archive when
+      the in-memory history is empty. Archived tracks come back without a stream url.
+      """
+      self.__record("history_pop")
+      if self.__history:
+         return self.__history.pop()
+      return self.__archive.pop()
 
    def clear_current(self):
       if not self.__current_track.empty:
-         self.__history.append(self.__current_track)
-      self.__current_track = Track()
+         self.__push_history(self.__current_track)
+      self.__set_current(Track())
+
+   def __set_current(self, track: Track) -> Track:
+      if track is not self.__current_track:
+         self.__current_track = track
+         self.__record("current", self.__encode(track))
+      return track
 
    def next_track(self, force_skip: bool = False) -> Track | None:
       """
@@ -103,15 +329,17 @@ class QueueManager:
       if not self.__current_track.empty:
          if self.__repeat_mode == RepeatMode.ALL:
             self.__queue.append(self.__current_track)
+            self.__record("queue_append", self.__encode(self.__current_track))
          else:
-            self.__history.append(self.__current_track)
+            self.__push_history(self.__current_track)
       
       if not self.__queue:
-         self.__current_track = Track()
+         self.__set_current(Track())
          return None
       
-      self.__current_track = self.__queue.popleft()
-      return self.__current_track
+      track = self.__queue.popleft()
+      self.__record("queue_popleft")
+      return self.__set_current(track)
    
    def back_track(self) -> Track | None:
       """
@@ -120,14 +348,15 @@ class QueueManager:
       Returns:
          The previous Track object from history, or None if history is empty.
       """
-      if not self.__history:
-         self.__current_track = Track()
+      if self.history_empty:
+         self.__set_current(Track())
          return None
       
       # Move the current track back to the front of the queue
       if not self.__current_track.empty:
          self.__queue.append(self.__current_track)
+         self.__record("queue_append", self.__encode(self.__current_track))
       
-      self.__current_track = self.__history.pop()
-      return self.__current_track
+      self.__set_current(self.__pop_history() or Track())
+      return None if self.__current_track.empty else self.__current_track
    
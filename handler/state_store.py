@@ -0,0 +1,127 @@
+import json
+import os
+import sqlite3
+from handler.config import STATE_STORE_PATH
+
+class StateStore:
+   """
+   Crash-safe store of per-guild queue state.
+
+   Every queue mutation is appended to a journal table as a small operation, instead of
+   rewriting the whole queue. From time to time a guild's journal is folded into a
+   snapshot. The database runs in WAL mode, so an append costs no fsync and a crash
+   loses at most the last few operations.
+   """
+   def __init__(self, path: str = STATE_STORE_PATH):
+      self.__path = path
+      self.__db: sqlite3.Connection | None = None
+
+   def __connect(self) -> sqlite3.Connection | None:
+      if self.__db is not None:
+         return self.__db
+      
+      try:
+         os.makedirs(os.path.dirname(self.__path) or ".", exist_ok=True)
+         db = sqlite3.connect(self.__path, isolation_level=None)
+         db.execute("PRAGMA journal_mode=WAL")
+         db.execute("PRAGMA synchronous=NORMAL")
+         db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS journal (
+               seq INTEGER PRIMARY KEY AUTOINCREMENT,
+               guild_id INTEGER NOT NULL,
+               op TEXT NOT NULL,
+               payload TEXT
+            )
+            """
+         )
+         db.execute("CREATE INDEX IF NOT EXISTS journal_guild ON journal (guild_id, seq)")
+         db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshot (
+               guild_id INTEGER PRIMARY KEY,
+               seq INTEGER NOT NULL,
+               state TEXT NOT NULL
+            )
+            """
+         )
+         self.__db = db
+      except sqlite3.Error as e:
+         print(f"Failed to open state store: {e}")
+         self.__db = None
+      
+      return self.__db
+
+   def record(self, guild_id: int, op: str, payload=None) -> None:
+      """
+      Appends one operation to a guild's journal.
+      """
+      db = self.__connect()
+      if db is None:
+         return
+      try:
+         db.execute(
+            "INSERT INTO journal (guild_id, op, payload) VALUES (?, ?, ?)",
+            (guild_id, op, None if payload is None else json.dumps(payload, ensure_ascii=False))
+         )
+      except sqlite3.Error as e:
+         print(f"Failed to journal {op} for guild {guild_id}: {e}")
+
+   def load(self, guild_id: int) -> tuple[dict | None, list]:
+      """
+      Reads a guild's latest snapshot and the operations journaled after it.
+
+      Returns:
+         The snapshot state (or None) and a list of (op, payload) tuples in order.
+      """
+      db = self.__connect()
+      if db is None:
+         return None, []
+      
+      try:
+         row = db.execute("SELECT seq, state FROM snapshot WHERE guild_id = ?", (guild_id,)).fetchone()
+         seq, state = (row[0], json.loads(row[1])) if row else (0, None)
+         ops = [
+            (op, None if payload is None else json.loads(payload))
+            for op, payload in db.execute(
+               "SELECT op, payload FROM journal WHERE guild_id = ? AND seq > ? ORDER BY seq",
+               (guild_id, seq)
+            )
+         ]
+      except (sqlite3.Error, ValueError) as e:
+         print(f"Failed to load state for guild {guild_id}: {e}")
+         return None, []
+      
+      return state, ops
+
+   def compact(self, guild_id: int, state: dict) -> None:
+      """
+      Replaces a guild's journal with a snapshot of its current state.
+      """
+      db = self.__connect()
+      if db is None:
+         return
+      
+      try:
+         db.execute("BEGIN")
+         seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM journal").fetchone()[0]
+         db.execute(
+            "INSERT OR REPLACE INTO snapshot (guild_id, seq, state) VALUES (?, ?, ?)",
+            (guild_id, seq, json.dumps(state, ensure_ascii=False))
+         )
+         db.execute("DELETE FROM journal WHERE guild_id = ? AND seq <= ?", (guild_id, seq))
+         db.execute("COMMIT")
+      except sqlite3.Error as e:
+         print(f"Failed to compact state for guild {guild_id}: {e}")
+         try:
+            db.execute("ROLLBACK")
+         except sqlite3.Error:
+            pass
+
+   def close(self) -> None:
+      if self.__db is not None:
+         self.__db.close()
+         self.__db = None
+
+# Process-wide store, guilds are restored from it lazily on first use
+state_store = StateStore()
@@ -1,12 +1,168 @@
-class Track:
-   def __init__(self, title="", author="", url="", duration=0, thumbnail=None):
+import sys
+from urllib.parse import urlparse, parse_qs
+
+def parseStreamExpiry(url: str) -> float | None:
+   """
+   Reads the expiry timestamp from a googlevideo stream url.
+
+   Args:
+      url: The stream url.
+
+   Returns:
+      Unix timestamp after which the url stops working, or None if the url carries no expiry.
+   """
+   parsed = urlparse(url)
+   expire = parse_qs(parsed.query).get("expire")
+   if expire:
+      value = expire[0]
+   else:
+      # Manifest-style urls carry parameters as path segments: /expire/<ts>/
+      parts = parsed.path.split("/")
+      if "expire" not in parts or parts.index("expire") + 1 >= len(parts):
+         return None
+      value = parts[parts.index("expire") + 1]
+   
+   try:
+      return float(value)
+   except ValueError:
+      return None
+
+BEGIN_URL = "https://youtu.be/"
+THUMBNAIL_HOST = "https://i.ytimg.com/"
+
+class TrackInfo:
+   """
+   Metadata of a video, shared by every queue entry of that video.
+   Obtain instances through `TrackInfo.intern` rather than the constructor.
+   Fields are only ever filled in, never replaced: a flat playlist entry may lack
+   the author or duration, which a later full extraction completes for everyone.
+
+   A video queued once must not cost more than a standalone record would, so the
+   registry is a plain dictionary pruned by counting the tracks using each entry
+   (a weak reference per video costs as much as the sharing saves), and standard
+   YouTube thumbnail urls are kept as their file name only.
+   """
+   __slots__ = ("video_id", "title", "author", "duration", "__thumbnail", "users")
+
+   # Instances keyed by video ID. Entries disappear with the last track using them.
+   __registry: "dict[str, TrackInfo]" = {}
+
+   def __init__(self, video_id: str, title: str, author: str, duration: int, thumbnail: str | None):
+      self.video_id = video_id
       self.title = title
       self.author = author
-      self.url = url
       self.duration = duration
       self.thumbnail = thumbnail
+      # Tracks holding this record, see `Track.__del__`
+      self.users = 0
+
+   @property
+   def thumbnail(self) -> str | None:
+      thumbnail = self.__thumbnail
+      if thumbnail and "://" not in thumbnail:
+         directory, _, name = thumbnail.partition("/")
+         return f"{THUMBNAIL_HOST}{directory}/{self.video_id}/{name}"
+      return thumbnail
+
+   @thumbnail.setter
+   def thumbnail(self, value: str | None) -> None:
+      # "https://i.ytimg.com/vi/<id>/hqdefault.jpg" is stored as "vi/hqdefault.jpg", one string for all videos.
+      # Playlist entries add a resize query, the plain url serves the same image.
+      if value and value.startswith(THUMBNAIL_HOST):
+         directory, _, rest = value[len(THUMBNAIL_HOST):].partition("?")[0].partition("/")
+         if rest.startswith(self.video_id + "/") and "/" not in rest[len(self.video_id) + 1:]:
+            value = sys.intern(f"{directory}/{rest[len(self.video_id) + 1:]}")
+      self.__thumbnail = value
+
+   @classmethod
+   def intern(cls, video_id: str, title: str, author: str, duration: int, thumbnail: str | None) -> "TrackInfo":
+      """
+      Returns the shared metadata for a video, creating it on first use,
+      so the same song queued in many guilds is stored once. Fields missing
+      from the shared record are completed from the given metadata.
+      The caller becomes one of its users and must `release` it.
+      """
+      info = cls.__registry.get(video_id)
+      if info is None:
+         info = cls(video_id, title, author, duration, thumbnail)
+         cls.__registry[video_id] = info
+      else:
+         if title and not info.title:
+            info.title = title
+         if author and not info.author:
+            info.author = author
+         if duration and not info.duration:
+            info.duration = duration
+         if thumbnail and not info.thumbnail:
+            info.thumbnail = thumbnail
+      info.users += 1
+      return info
+
+   def release(self) -> None:
+      """
+      Drops one user, removing the record from the registry after the last one.
+      """
+      self.users -= 1
+      registry = self.__registry
+      if self.users <= 0 and registry.get(self.video_id) is self:
+         del registry[self.video_id]
+
+   @classmethod
+   def registry_size(cls) -> int:
+      return len(cls.__registry)
+
+   @property
+   def url(self) -> str:
+      # Non-YouTube links are stored whole in place of the video ID
+      return self.video_id if "://" in self.video_id else BEGIN_URL + self.video_id
+
+class Track:
+   """
+   A queue entry: shared metadata plus the per-entry state
+   (stream url, its codec and expiry, and who requested it).
+   """
+   __slots__ = ("__info", "__stream_url", "__stream_expires_at", "codec", "requester")
+
+   def __init__(self, title="", author="", url="", duration=0, thumbnail=None, requester: int | None = None):
+      self.__info = None
+      if url:
+         video_id = url[len(BEGIN_URL):] if url.startswith(BEGIN_URL) else url
+         self.__info = TrackInfo.intern(video_id, title, author, duration, thumbnail)
       self.__stream_url = ""
-      self.__BEGIN_URL = "https://youtu.be/"
+      self.__stream_expires_at: float | None = None
+      # Audio codec of the stream as reported by yt-dlp, e.g. "opus"; None when unknown
+      self.codec: str | None = None
+      # ID of the user who added the track
+      self.requester = requester
+
+   def __del__(self):
+      info = self.__info
+      if info is not None:
+         info.release()
+
+   @property
+   def info(self) -> TrackInfo | None:
+      return self.__info
+
+   @property
+   def title(self) -> str:
+      return self.__info.title if self.__info else ""
+
+   @property
+   def author(self) -> str:
+      return self.__info.author if self.__info else ""
+
+   @property
+   def url(self) -> str:
+      return self.__info.url if self.__info else ""
+
+   @property
+   def duration(self) -> int:
+      return self.__info.duration if self.__info else 0
+
+   @property
+   def thumbnail(self) -> str | None:
+      return self.__info.thumbnail if self.__info else None
    
    @property
    def stream_url(self) -> str:
@@ -17,12 +173,21 @@ class Track:
       if not value.startswith("http"):
          raise ValueError("Invalid stream url")
       self.__stream_url = value
+      self.__stream_expires_at = parseStreamExpiry(value)
+
+   @property
+   def stream_expires_at(self) -> float | None:
+      """
+      Unix timestamp at which the stream url expires, or None if unknown.
+      """
+      return self.__stream_expires_at
 
    @property
    def begin_url(self) -> str:
-      return self.__BEGIN_URL
+      return BEGIN_URL
    
    @property
    def empty(self) -> bool:
-      return self.__stream_url == ""
-   
\ No newline at end of file
+      # A track restored from the metadata cache has no stream url until playback starts,
+      # so emptiness is decided by the video url
+      return self.__info is None
@@ -0,0 +1,210 @@
+import random
+from itertools import count
+from collections.abc import Sequence
+from typing import NamedTuple
+from handler.track import Track
+
+class TrackPage(NamedTuple):
+   """
+   One page of a track list, as handed to the cogs.
+   """
+   items: tuple
+   # Index of the first item in the whole list
+   start: int
+   page: int
+   pages: int
+   total: int
+   total_duration: int
+
+class TrackList:
+   """
+   Indexed track container used for the queue and the history.
+
+   Tracks live in a Python list with a moving head, so indexed access and
+   appending are O(1), popping from the front is amortised O(1), and
+   remove/move at a position are a single memmove. The number of tracks and their
+   total duration are maintained incrementally, and `version` changes on every
+   mutation so readers can cache what they derived from the list. Versions are
+   drawn from one process-wide counter, so two lists never share a version.
+   """
+   __versions = count(1)
+
+   def __init__(self, tracks=()):
+      self.__items: list = list(tracks)
+      self.__head = 0
+      self.__total_duration = sum(t.duration for t in self.__items)
+      self.__version = next(TrackList.__versions)
+
+   def __len__(self) -> int:
+      return len(self.__items) - self.__head
+
+   def __bool__(self) -> bool:
+      return len(self) > 0
+
+   def __getitem__(self, index):
+      if isinstance(index, slice):
+         start, stop, step = index.indices(len(self))
+         if step == 1:
+            return self.__items[self.__head + start:self.__head + stop]
+         # Offsetting the bounds breaks negative steps (a stop of -1 would wrap), so map each index
+         return [self.__items[self.__head + i] for i in range(start, stop, step)]
+      return self.__items[self.__head + self.__normalize(index)]
+
+   def __iter__(self):
+      for i in range(self.__head, len(self.__items)):
+         yield self.__items[i]
+
+   def __reversed__(self):
+      for i in range(len(self.__items) - 1, self.__head - 1, -1):
+         yield self.__items[i]
+
+   def __normalize(self, index: int) -> int:
+      size = len(self)
+      if index < 0:
+         index += size
+      if not 0 <= index < size:
+         raise IndexError("track index out of range")
+      return index
+
+   @property
+   def total_duration(self) -> int:
+      return self.__total_duration
+
+   @property
+   def version(self) -> int:
+      return self.__version
+
+   def __changed(self) -> None:
+      self.__version = next(TrackList.__versions)
+
+   def append(self, track: Track) -> None:
+      self.__items.append(track)
+      self.__total_duration += track.duration
+      self.__changed()
+
+   def appendleft(self, track: Track) -> None:
+      if self.__head:
+         self.__head -= 1
+         self.__items[self.__head] = track
+      else:
+         self.__items.insert(0, track)
+      self.__total_duration += track.duration
+      self.__changed()
+
+   def popleft(self) -> Track:
+      if not self:
+         raise IndexError("pop from an empty track list")
+      
+      track = self.__items[self.__head]
+      # Drop the reference so the slot does not keep the track alive
+      self.__items[self.__head] = None
+      self.__head += 1
+      # Reclaim the dead prefix once it outweighs the live part
+      if self.__head > 32 and self.__head * 2 > len(self.__items):
+         del self.__items[:self.__head]
+         self.__head = 0
+      
+      self.__total_duration -= track.duration
+      self.__changed()
+      return track
+
+   def pop(self, index: int = -1) -> Track:
+      """
+      Removes and returns the track at `index` (the last one by default).
+      """
+      if not self:
+         raise IndexError("pop from an empty track list")
+      
+      index = self.__normalize(index)
+      if index == 0:
+         return self.popleft()
+      
+      track = self.__items.pop(self.__head + index)
+      self.__total_duration -= track.duration
+      self.__changed()
+      return track
+
+   def remove(self, index: int) -> Track:
+      return self.pop(index)
+
+   def move(self, source: int, destination: int) -> None:
+      """
+      Moves the track at `source` so that it ends up at `destination`.
+      """
+      source = self.__normalize(source)
+      destination = self.__normalize(destination)
+      if source == destination:
+         return
+      
+      track = self.__items.pop(self.__head + source)
+      self.__items.insert(self.__head + destination, track)
+      self.__changed()
+
+   def shuffle(self) -> None:
+      """
+      Shuffles the tracks in place (Fisher-Yates), without copying the list.
+      """
+      items, head = self.__items, self.__head
+      for i in range(len(items) - 1, head, -1):
+         j = random.randint(head, i)
+         items[i], items[j] = items[j], items[i]
+      self.__changed()
+
+   def clear(self) -> None:
+      self.__items.clear()
+      self.__head = 0
+      self.__total_duration = 0
+      self.__changed()
+
+   def page(self, number: int, size: int = 10) -> TrackPage:
+      """
+      Returns one page of tracks, copying only the tracks on that page.
+
+      Args:
+         number: Zero-based page number, clamped to the last page.
+         size: Number of tracks per page.
+      """
+      total = len(self)
+      pages = max(1, -(-total // size))
+      number = min(max(number, 0), pages - 1)
+      start = number * size
+      return TrackPage(
+         items=tuple(self[start:start + size]),
+         start=start,
+         page=number,
+         pages=pages,
+         total=total,
+         total_duration=self.__total_duration
+      )
+
+class TrackListView(Sequence):
+   """
+   Read-only view of a TrackList. Does not copy the tracks.
+   """
+   __slots__ = ("_tracks",)
+
+   def __init__(self, tracks: TrackList):
+      self._tracks = tracks
+
+   def __len__(self) -> int:
+      return len(self._tracks)
+
+   def __getitem__(self, index):
+      return self._tracks[index]
+
+   def __iter__(self):
+      return iter(self._tracks)
+
+   def __reversed__(self):
+      return reversed(self._tracks)
+
+   @property
+   def total_duration(self) -> int:
+      return self._tracks.total_duration
+
+   @property
+   def version(self) -> int:
+      return self._tracks.version
+
+   def page(self, number: int, size: int = 10) -> TrackPage:
+      return self._tracks.page(number, size)
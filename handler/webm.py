@@ -0,0 +1,273 @@
+from collections import deque
+import discord
+
+# Matroska / WebM element IDs used by the demuxer
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_NUMBER = 0xD7
+CODEC_ID = 0x86
+CLUSTER = 0x1F43B675
+BLOCK_GROUP = 0xA0
+BLOCK = 0xA1
+SIMPLE_BLOCK = 0xA3
+
+# Master elements whose children are parsed; every other element is skipped
+CONTAINERS = {SEGMENT, TRACKS, TRACK_ENTRY, CLUSTER, BLOCK_GROUP}
+
+class WebMError(Exception):
+   """
+   Raised when the stream is not a WebM file with an Opus audio track.
+   """
+   pass
+
+class WebMOpusDemuxer:
+   """
+   Streaming demuxer extracting Opus packets from a WebM (Matroska) byte stream.
+
+   Elements are parsed one by one from a file-like source, so memory use does not
+   depend on the track length and packets are available as soon as their cluster arrives.
+   """
+   def __init__(self, source):
+      """
+      Args:
+         source: File-like object whose `read(size)` returns up to `size` bytes, b"" at the end.
+      """
+      self.__source = source
+      self.__buffer = bytearray()
+      self.__track_number: int | None = None
+      self.__packets: deque = deque()
+      self.__finished = False
+
+   def __fill(self, size: int) -> bool:
+      while len(self.__buffer) < size:
+         chunk = self.__source.read(max(size - len(self.__buffer), 64 * 1024))
+         if not chunk:
+            return False
+         self.__buffer.extend(chunk)
+      return True
+
+   def __read(self, size: int) -> bytes:
+      if not self.__fill(size):
+         raise EOFError
+      data = bytes(self.__buffer[:size])
+      del self.__buffer[:size]
+      return data
+
+   def __skip(self, size: int) -> None:
+      while size > 0:
+         if not self.__buffer and not self.__fill(1):
+            raise EOFError
+         step = min(size, len(self.__buffer))
+         del self.__buffer[:step]
+         size -= step
+
+   def __read_vint(self, keep_marker: bool) -> tuple[int, int]:
+      """
+      Reads an EBML variable-length integer.
+
+      Returns:
+         The value and its length in bytes. A size with every value bit set
+         ("unknown size") is returned as -1.
+      """
+      first = self.__read(1)[0]
+      length = 1
+      mask = 0x80
+      while length <= 8 and not first & mask:
+         mask >>= 1
+         length += 1
+      if length > 8:
+         raise WebMError("Invalid EBML variable-length integer")
+
+      value = first if keep_marker else first & (mask - 1)
+      for byte in self.__read(length - 1):
+         value = (value << 8) | byte
+
+      if not keep_marker and value == (1 << (7 * length)) - 1:
+         return -1, length
+      return value, length
+
+   def __read_element(self) -> tuple[int, int]:
+      element_id, _ = self.__read_vint(keep_marker=True)
+      size, _ = self.__read_vint(keep_marker=False)
+      return element_id, size
+
+   def open(self) -> None:
+      """
+      Parses the header up to the Opus track definition.
+      Blocking: reads from the source, so it must not run on the event loop.
+
+      Raises:
+         WebMError: If the stream is not WebM or has no Opus track.
+      """
+      try:
+         element_id, size = self.__read_element()
+         if element_id != EBML_HEADER:
+            raise WebMError("Not a WebM stream")
+         self.__skip(size)
+
+         while self.__track_number is None:
+            element_id, size = self.__read_element()
+            if element_id == TRACK_ENTRY:
+               self.__read_track_entry(size)
+            elif element_id == CLUSTER:
+               # Track definitions always precede the first cluster
+               break
+            elif element_id in CONTAINERS:
+               continue
+            else:
+               self.__skip(size)
+      except EOFError:
+         raise WebMError("Stream ended before the audio track was found")
+      
+      if self.__track_number is None:
+         raise WebMError("No Opus track in the stream")
+
+   def __read_track_entry(self, size: int) -> None:
+      data = self.__read(size)
+      number, codec = None, None
+      position = 0
+      while position < len(data):
+         element_id, position = self.__parse_vint(data, position, keep_marker=True)
+         length, position = self.__parse_vint(data, position, keep_marker=False)
+         payload = data[position:position + length]
+         position += length
+         if element_id == TRACK_NUMBER:
+            number = int.from_bytes(payload, "big")
+         elif element_id == CODEC_ID:
+            codec = payload.decode("ascii", "replace").rstrip("\x00")
+      
+      if codec == "A_OPUS" and number is not None:
+         self.__track_number = number
+
+   @staticmethod
+   def __parse_vint(data: bytes, position: int, keep_marker: bool) -> tuple[int, int]:
+      first = data[position]
+      length = 1
+      mask = 0x80
+      while length <= 8 and not first & mask:
+         mask >>= 1
+         length += 1
+      if length > 8:
+         raise WebMError("Invalid EBML variable-length integer")
+      
+      value = first if keep_marker else first & (mask - 1)
+      for byte in data[position + 1:position + length]:
+         value = (value << 8) | byte
+      return value, position + length
+
+   def read_packet(self) -> bytes:
+      """
+      Returns the next Opus packet, or b"" at the end of the stream.
+      Blocking: must not run on the event loop.
+      """
+      while not self.__packets:
+         if self.__finished:
+            return b""
+         try:
+            element_id, size = self.__read_element()
+         except EOFError:
+            self.__finished = True
+            return b""
+
+         if element_id in CONTAINERS:
+            # Clusters of a live stream may have an unknown size, their children follow directly
+            continue
+         if element_id in (SIMPLE_BLOCK, BLOCK):
+            try:
+               self.__parse_block(self.__read(size))
+            except EOFError:
+               self.__finished = True
+         elif size < 0:
+            raise WebMError("Unknown-size element outside a cluster")
+         else:
+            try:
+               self.__skip(size)
+            except EOFError:
+               self.__finished = True
+      
+      return self.__packets.popleft()
+
+   def __parse_block(self, block: bytes) -> None:
+      track, position = self.__parse_vint(block, 0, keep_marker=False)
+      if track != self.__track_number:
+         return
+      
+      # Skip the 16-bit relative timecode
+      flags = block[position + 2]
+      position += 3
+      lacing = (flags >> 1) & 0x03
+
+      if lacing == 0:
+         self.__packets.append(block[position:])
+         return
+      
+      count = block[position] + 1
+      position += 1
+      sizes = []
+
+      if lacing == 1: # Xiph lacing
+         for _ in range(count - 1):
+            size = 0
+            while True:
+               byte = block[position]
+               position += 1
+               size += byte
+               if byte != 255:
+                  break
+            sizes.append(size)
+      elif lacing == 3: # EBML lacing
+         size, position = self.__parse_vint(block, position, keep_marker=False)
+         sizes.append(size)
+         for _ in range(count - 2):
+            start = position
+            raw, position = self.__parse_vint(block, position, keep_marker=False)
+            length = position - start
+            size += raw - ((1 << (7 * length - 1)) - 1)
+            sizes.append(size)
+      else: # Fixed-size lacing
+         sizes = [(len(block) - position) // count] * (count - 1)
+
+      sizes.append(len(block) - position - sum(sizes))
+      for size in sizes:
+         self.__packets.append(block[position:position + size])
+         position += size
+
+class WebMOpusAudio(discord.AudioSource):
+   """
+   Audio source sending the Opus packets of a WebM stream to Discord as they are,
+   without an ffmpeg subprocess.
+   """
+   def __init__(self, source):
+      """
+      Args:
+         source: File-like stream of the WebM data, usually a PrebufferedStream.
+            `open` must be called before the source is played.
+      """
+      self.__source = source
+      self.__demuxer = WebMOpusDemuxer(source)
+
+   def open(self) -> None:
+      """
+      Reads the stream header. Blocking, run it in an executor.
+
+      Raises:
+         WebMError: If the stream is not Opus in WebM.
+      """
+      self.__demuxer.open()
+
+   def is_opus(self) -> bool:
+      return True
+
+   def read(self) -> bytes:
+      try:
+         return self.__demuxer.read_packet()
+      except WebMError as e:
+         print(f"WebM demuxing error: {e}")
+         return b""
+
+   def cleanup(self) -> None:
+      close = getattr(self.__source, "close", None)
+      if close is not None:
+         close()
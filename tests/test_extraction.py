@@ -0,0 +1,22 @@
+import asyncio
+import time
+import pytest
+from utils.extraction import ExtractionExecutor, ExtractionTimeout
+
+def test_waiting_for_a_slot_counts_against_the_timeout():
+   async def scenario():
+      executor = ExtractionExecutor(max_workers=1, timeout=0.2, backend="thread")
+      # One call runs and one waits in the pool, which takes both slots of a single worker
+      busy = [asyncio.create_task(executor.run(time.sleep, 0.3, timeout=1)) for _ in range(2)]
+      await asyncio.sleep(0.05)
+      started = time.monotonic()
+      try:
+         with pytest.raises(ExtractionTimeout):
+            await executor.run(time.sleep, 0)
+         return time.monotonic() - started
+      finally:
+         await asyncio.gather(*busy)
+         executor.shutdown()
+
+   # The second call never got a slot, yet it gives up at its own deadline
+   assert asyncio.run(scenario()) < 0.35
@@ -0,0 +1,223 @@
+"""
+Runs every slash command against a gateway cache filled the way Discord fills it
+for a given set of intents, and checks that the lean profile answers exactly like
+the full one. The intents a cog really needs are measured by dropping one intent at
+a time, and the manifest must declare all of them.
+"""
+import asyncio
+import discord
+import pytest
+import handler.music_handler
+import utils.utils
+from bot.bot import Bot, gatewayProfile
+from handler.state_store import StateStore
+
+GUILD_ID = 1000
+TEXT_CHANNEL_ID = 1001
+VOICE_CHANNEL_ID = 1002
+USER_ID = 2000
+BOT_ID = 3000
+
+def userPayload(user_id: int, name: str) -> dict:
+   return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": name, "avatar": "a" * 32}
+
+def memberPayload(user_id: int, name: str) -> dict:
+   return {
+      "user": userPayload(user_id, name), "roles": [], "joined_at": "2024-01-01T00:00:00+00:00",
+      "deaf": False, "mute": False, "flags": 0, "permissions": "8"
+   }
+
+def guildCreate() -> dict:
+   return {
+      "id": str(GUILD_ID), "name": "guild", "owner_id": str(USER_ID), "features": [], "emojis": [],
+      "stickers": [], "member_count": 2, "large": False, "unavailable": False, "voice_states": [],
+      "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "8", "position": 0,
+                 "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0}],
+      "channels": [
+         {"id": str(TEXT_CHANNEL_ID), "type": 0, "name": "text", "position": 0, "permission_overwrites": []},
+         {"id": str(VOICE_CHANNEL_ID), "type": 2, "name": "voice", "position": 1, "permission_overwrites": [],
+          "bitrate": 64000, "user_limit": 0}
+      ],
+      "members": [memberPayload(BOT_ID, "bot")]
+   }
+
+def voiceStateUpdate() -> dict:
+   return {
+      "guild_id": str(GUILD_ID), "channel_id": str(VOICE_CHANNEL_ID), "user_id": str(USER_ID),
+      "member": memberPayload(USER_ID, "user"), "session_id": "session", "deaf": False, "mute": False,
+      "self_deaf": False, "self_mute": False, "self_video": False, "suppress": False,
+      "request_to_speak_timestamp": None
+   }
+
+# Events Discord only sends to a bot that enabled the intent, in the order they arrive
+GATEWAY_EVENTS = [
+   ("guilds", "GUILD_CREATE", guildCreate),
+   ("voice_states", "VOICE_STATE_UPDATE", voiceStateUpdate),
+]
+
+# Slash commands and their arguments. Commands that write settings or go to the network are given
+# inputs that answer before doing so; /language is covered by /lang of the same cog.
+COMMANDS = {
+   "back": {}, "history": {}, "join": {}, "lang": {}, "leave": {}, "ping": {},
+   "play": {"url": "not a url"}, "queue": {}, "repeat_all": {}, "repeat_one": {},
+   "search": {"title": "song"}, "skip": {}, "stop": {},
+}
+
+class FakeVoiceClient:
+   """
+   The bot's own voice connection in the guild, looked up from the cache like discord.py's.
+   """
+   def __init__(self, bot):
+      self.__bot = bot
+
+   @property
+   def guild(self):
+      return self.__bot.get_guild(GUILD_ID)
+
+   @property
+   def channel(self):
+      guild = self.guild
+      return guild.get_channel(VOICE_CHANNEL_ID) if guild is not None else None
+
+   def is_connected(self) -> bool:
+      return True
+
+   def is_playing(self) -> bool:
+      return False
+
+   def is_paused(self) -> bool:
+      return False
+
+   def stop(self) -> None:
+      pass
+
+   async def disconnect(self, *, force: bool = False) -> None:
+      pass
+
+class Replies:
+   """
+   Stands in for the interaction response and followup webhook, recording what a command answers.
+   """
+   def __init__(self):
+      self.sent: list[tuple] = []
+
+   @staticmethod
+   def __describe(content, embed) -> str | None:
+      return content if content is not None else embed.title if embed is not None else None
+
+   def is_done(self) -> bool:
+      return any(kind != "followup" for kind, _ in self.sent)
+
+   async def defer(self, **kwargs) -> None:
+      self.sent.append(("defer", None))
+
+   async def send_message(self, content=None, *, embed=None, **kwargs) -> None:
+      self.sent.append(("message", self.__describe(content, embed)))
+
+   async def edit_message(self, *, content=None, embed=None, **kwargs) -> None:
+      self.sent.append(("edit", self.__describe(content, embed)))
+
+   async def send(self, content=None, *, embed=None, **kwargs) -> None:
+      self.sent.append(("followup", self.__describe(content, embed)))
+
+def interactionPayload(name: str) -> dict:
+   return {
+      "id": "5000", "application_id": str(BOT_ID), "type": 2, "token": "token", "version": 1,
+      "guild_id": str(GUILD_ID), "channel_id": str(TEXT_CHANNEL_ID),
+      "channel": {"id": str(TEXT_CHANNEL_ID), "type": 0, "guild_id": str(GUILD_ID), "name": "text", "position": 0},
+      "member": memberPayload(USER_ID, "user"), "data": {"id": "6000", "name": name, "type": 1},
+      "locale": "en-US", "guild_locale": "en-US", "app_permissions": "8", "entitlements": [],
+      "authorizing_integration_owners": {}, "context": 0, "attachment_size_limit": 8388608
+   }
+
+def intentsWithout(profile: str, dropped: str | None) -> discord.Intents:
+   intents = gatewayProfile(profile)["intents"]
+   if dropped is not None:
+      setattr(intents, dropped, False)
+   return intents
+
+async def answers(profile: str, dropped: str | None = None) -> dict[str, tuple]:
+   """
+   Loads the cogs under a gateway profile, optionally without one of its intents,
+   delivers the gateway events those intents receive and runs every command.
+
+   Returns:
+      Command name -> what the command answered, or the error it raised.
+   """
+   bot = Bot(profile=profile)
+   # Set by discord.py on login, which the test never does
+   bot.loop = asyncio.get_running_loop()
+   intents = intentsWithout(profile, dropped)
+   # Discord.py decides its member cache from these, as the profile does
+   bot._connection._intents = intents
+   await bot.load()
+   bot.locale_manager.get_text = lambda guild_id, key, **kwargs: key
+
+   state = bot._connection
+   state.user = discord.ClientUser(state=state, data=userPayload(BOT_ID, "bot"))
+   for intent, event, payload in GATEWAY_EVENTS:
+      if getattr(intents, intent):
+         state.parsers[event](payload())
+   state._add_voice_client(GUILD_ID, FakeVoiceClient(bot))
+
+   result = {}
+   try:
+      for name, arguments in COMMANDS.items():
+         command = bot.tree.get_command(name)
+         interaction = discord.Interaction(data=interactionPayload(name), state=state)
+         replies = Replies()
+         interaction._cs_response = replies
+         interaction._cs_followup = replies
+         try:
+            await command.callback(command.binding, interaction, **arguments)
+            result[name] = tuple(replies.sent)
+         except Exception as e:
+            result[name] = (("error", type(e).__name__),)
+         # Let the player task handle what the command posted
+         await asyncio.sleep(0)
+   finally:
+      (await bot.getMusicHandler(GUILD_ID)).shutdown()
+   return result
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+   # Queue state of the test guild stays out of the bot's data directory
+   monkeypatch.setattr(handler.music_handler, "state_store", StateStore(str(tmp_path / "state.sqlite3")))
+
+   # Without a gateway connection discord.py measures no latency, which /ping rounds
+   monkeypatch.setattr(Bot, "latency", 0.05)
+
+   async def offline(title: str):
+      raise RuntimeError("no network in tests")
+   # Cogs are loaded as fresh modules, which import it from here
+   monkeypatch.setattr(utils.utils, "extractInfoByTitle", offline)
+
+def cogOf(bot: Bot, name: str) -> str:
+   return type(bot.tree.get_command(name).binding).__module__.removeprefix("cogs.")
+
+def test_lean_profile_answers_like_full():
+   full = asyncio.run(answers("full"))
+   lean = asyncio.run(answers("lean"))
+   # The commands get far enough to answer from the caches, not just fail the same way
+   assert all(reply[0][0] != "error" for reply in full.values()), full
+   assert lean == full
+
+def test_manifest_declares_the_intents_cogs_need():
+   bot = Bot(profile="lean")
+   asyncio.run(bot.load())
+   manifest = bot.read_manifest()
+   lean = {name for name, value in gatewayProfile("lean")["intents"] if value}
+
+   baseline = asyncio.run(answers("lean"))
+   needed: dict[str, set] = {}
+   for intent in lean:
+      without = asyncio.run(answers("lean", dropped=intent))
+      for name in COMMANDS:
+         if without[name] != baseline[name]:
+            needed.setdefault(cogOf(bot, name), set()).add(intent)
+
+   # Dropping either lean intent must break something, or the test measures nothing
+   assert set().union(*needed.values()) == lean
+   for cog, intents in needed.items():
+      assert intents <= set(manifest[cog]["intents"]), f"{cog} needs {sorted(intents)}"
+   assert not bot.check_intents(manifest)
@@ -0,0 +1,88 @@
+"""
+Player task transitions, driven through a voice client that behaves like discord.py's:
+stopping a source runs its `after` callback.
+"""
+import asyncio
+import discord
+import pytest
+import handler.music_handler
+from handler.music_handler import MusicHandler
+from handler.state_store import StateStore
+from handler.track import Track
+
+class FakeSource:
+   def __init__(self, source, **kwargs):
+      self.source = source
+
+class FakeVoiceClient:
+   def __init__(self):
+      self.started: list = []
+      self.__after = None
+
+   def is_connected(self) -> bool:
+      return True
+
+   def is_playing(self) -> bool:
+      return self.__after is not None
+
+   def is_paused(self) -> bool:
+      return False
+
+   def play(self, source, *, after) -> None:
+      self.started.append(source)
+      self.__after = after
+
+   def stop(self) -> None:
+      after, self.__after = self.__after, None
+      if after is not None:
+         after(None)
+
+class FakeBot:
+   def __init__(self, loop: asyncio.AbstractEventLoop):
+      self.loop = loop
+
+   def get_guild(self, guild_id: int):
+      return None
+
+@pytest.fixture
+def resolved(monkeypatch, tmp_path) -> list:
+   """
+   Titles of the tracks whose stream url the player resolved, in order.
+   """
+   titles = []
+
+   async def resolve(track: Track) -> Track:
+      titles.append(track.title)
+      await asyncio.sleep(0.01)
+      return track
+
+   monkeypatch.setattr(handler.music_handler, "state_store", StateStore(str(tmp_path / "state.sqlite3")))
+   monkeypatch.setattr(handler.music_handler, "updateWorkingStreamLink", resolve)
+   monkeypatch.setattr(handler.music_handler, "scheduleStreamRefresh", lambda tracks: None)
+   monkeypatch.setattr(handler.music_handler, "PREBUFFER_ENABLED", False)
+   monkeypatch.setattr(discord, "FFmpegOpusAudio", FakeSource)
+   monkeypatch.setattr(discord, "FFmpegPCMAudio", FakeSource)
+   return titles
+
+def test_skip_burst_starts_only_the_final_track(resolved):
+   async def scenario():
+      musicHandler = MusicHandler(FakeBot(asyncio.get_running_loop()), 1)
+      voice = FakeVoiceClient()
+      for i in range(5):
+         musicHandler.add_track(Track(title=f"t{i}", url=f"https://www.youtube.com/watch?v=track{i:06d}"))
+
+      await musicHandler.play(voice)
+      await asyncio.sleep(0.1)
+      for _ in range(3):
+         await musicHandler.skip(voice)
+         await asyncio.sleep(0.02)
+      await asyncio.sleep(0.5)
+      musicHandler.shutdown()
+      return musicHandler, voice
+
+   musicHandler, voice = asyncio.run(scenario())
+   # t0 was started by play, the burst resolves and starts t3 only
+   assert resolved == ["t0", "t3"]
+   assert len(voice.started) == 2
+   assert musicHandler.get_current_track().title == "t3"
+   assert musicHandler.transitions_saved == 2
@@ -0,0 +1,53 @@
+import gc
+import tracemalloc
+from handler.track import Track, TrackInfo, BEGIN_URL
+
+class LegacyTrack:
+   """
+   The Track class before metadata was shared: one dictionary of fields per entry.
+   """
+   def __init__(self, title="", author="", url="", duration=0, thumbnail=None):
+      self.title = title
+      self.author = author
+      self.url = url
+      self.duration = duration
+      self.thumbnail = thumbnail
+      self.__stream_url = ""
+      self.__BEGIN_URL = BEGIN_URL
+
+def metadata(index: int) -> dict:
+   video_id = f"{index:011d}"
+   return {
+      "title": f"Artist {index} - Some Song Title (Official Video)",
+      "author": f"Artist {index}",
+      "url": BEGIN_URL + video_id,
+      "duration": 180 + index % 120,
+      "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg?sqp=-oaymwEjCNACELwBSFryq4qpAxUIARUAAAAAGAElAADIQj0AgKJDeAE",
+   }
+
+def allocated(factory, entries: int) -> int:
+   gc.collect()
+   tracemalloc.start()
+   tracks = [factory(**metadata(i)) for i in range(entries)]
+   size, _ = tracemalloc.get_traced_memory()
+   tracemalloc.stop()
+   del tracks
+   gc.collect()
+   return size
+
+def test_distinct_videos_cost_no_more_than_legacy_tracks():
+   # Sharing only pays off for repeated videos, it must not cost extra when nothing repeats
+   assert allocated(Track, 20_000) <= allocated(LegacyTrack, 20_000)
+
+def test_metadata_is_shared_and_released_with_the_last_track():
+   first = Track(title="Song", url=BEGIN_URL + "aaaaaaaaaaa")
+   second = Track(url=BEGIN_URL + "aaaaaaaaaaa", duration=200, thumbnail="https://i.ytimg.com/vi/aaaaaaaaaaa/hqdefault.jpg")
+   assert first.info is second.info
+   assert (first.title, first.duration) == ("Song", 200)
+   assert first.thumbnail == "https://i.ytimg.com/vi/aaaaaaaaaaa/hqdefault.jpg"
+
+   size = TrackInfo.registry_size()
+   del first
+   assert TrackInfo.registry_size() == size
+   del second
+   assert TrackInfo.registry_size() == size - 1
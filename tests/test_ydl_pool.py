@@ -0,0 +1,34 @@
+import yt_dlp
+from yt_dlp.utils import OnDemandPagedList
+from utils.ydl_pool import listPlaylistEntries
+
+PAGE_SIZE = 10
+
+def test_playlist_page_fetches_only_its_own_page(monkeypatch):
+   fetched = []
+
+   def page(number: int):
+      fetched.append(number)
+      for i in range(number * PAGE_SIZE, min((number + 1) * PAGE_SIZE, 45)):
+         video_id = f"{i:011d}"
+         yield {
+            "_type": "url", "ie_key": "Youtube", "id": video_id, "title": f"Song {i}",
+            "url": f"https://www.youtube.com/watch?v={video_id}", "duration": 180
+         }
+
+   # Stands in for an extractor that pages its entries by index, the processing is yt-dlp's own
+   def extract(self, url, download=True, process=True):
+      return {
+         "_type": "playlist", "id": "PL", "title": "Playlist", "webpage_url": url,
+         "extractor": "youtube:tab", "extractor_key": "YoutubeTab", "entries": OnDemandPagedList(page, PAGE_SIZE)
+      }
+   monkeypatch.setattr(yt_dlp.YoutubeDL, "extract_info", extract)
+
+   entries, listed = listPlaylistEntries("https://www.youtube.com/playlist?list=PL", 20, PAGE_SIZE)
+   assert [entry["title"] for entry in entries] == [f"Song {i}" for i in range(20, 30)]
+   assert listed == PAGE_SIZE
+   assert fetched == [2]
+
+   # The last page lists fewer positions than requested
+   entries, listed = listPlaylistEntries("https://www.youtube.com/playlist?list=PL", 40, PAGE_SIZE)
+   assert listed == 5
@@ -0,0 +1,253 @@
+import os
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from handler.config import (
+   METADATA_CACHE_PATH, 
+   METADATA_CACHE_TTL, 
+   METADATA_CACHE_MEMORY_SIZE, 
+   METADATA_CACHE_DISK_SIZE,
+   SEARCH_CACHE_SIZE,
+   SEARCH_CACHE_TTL
+)
+
+class LRUCache:
+   """
+   In-memory least-recently-used cache with a per-entry time to live.
+   """
+   def __init__(self, maxsize: int, ttl: float):
+      """
+      Args:
+         maxsize: Maximum number of entries kept before the oldest one is evicted.
+         ttl: Lifetime of an entry in seconds.
+      """
+      self.__maxsize = maxsize
+      self.__ttl = ttl
+      self.__data: OrderedDict = OrderedDict()
+
+   def __len__(self) -> int:
+      return len(self.__data)
+
+   def get(self, key, default=None):
+      """
+      Returns the cached value and marks it as recently used.
+      Expired entries are removed and reported as missing.
+      """
+      item = self.__data.get(key)
+      if item is None:
+         return default
+
+      expires_at, value = item
+      if expires_at < time.monotonic():
+         del self.__data[key]
+         return default
+
+      self.__data.move_to_end(key)
+      return value
+
+   def put(self, key, value, ttl: float | None = None) -> None:
+      """
+      Stores a value, evicting the least recently used entries when full.
+      """
+      ttl = self.__ttl if ttl is None else ttl
+      self.__data[key] = (time.monotonic() + ttl, value)
+      self.__data.move_to_end(key)
+
+      while len(self.__data) > self.__maxsize:
+         self.__data.popitem(last=False)
+
+   def pop(self, key, default=None):
+      item = self.__data.pop(key, None)
+      return default if item is None else item[1]
+
+   def clear(self) -> None:
+      self.__data.clear()
+
+class MetadataCache:
+   """
+   Two-tier cache of track metadata keyed by video ID.
+
+   The memory tier is an LRU with TTL; the disk tier is an SQLite table that
+   survives restarts and is trimmed to a fixed number of entries.
+   """
+   def __init__(
+         self, 
+         path: str = METADATA_CACHE_PATH, 
+         ttl: float = METADATA_CACHE_TTL,
+         memory_size: int = METADATA_CACHE_MEMORY_SIZE, 
+         disk_size: int = METADATA_CACHE_DISK_SIZE
+      ):
+      self.__path = path
+      self.__ttl = ttl
+      self.__disk_size = disk_size
+      self.__memory = LRUCache(memory_size, ttl)
+      self.__db: sqlite3.Connection | None = None
+      self.__writes = 0
+      self.hits = 0
+      self.misses = 0
+
+   def __connect(self) -> sqlite3.Connection | None:
+      if self.__db is not None:
+         return self.__db
+      
+      try:
+         os.makedirs(os.path.dirname(self.__path) or ".", exist_ok=True)
+         self.__db = sqlite3.connect(self.__path)
+         # Cluster workers share the file; in WAL mode their reads never wait for a write
+         self.__db.execute("PRAGMA journal_mode=WAL")
+         # Commits from the event loop must not fsync; WAL keeps the file consistent without it
+         self.__db.execute("PRAGMA synchronous=NORMAL")
+         self.__db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS metadata (
+               video_id TEXT PRIMARY KEY,
+               title TEXT,
+               author TEXT,
+               duration INTEGER,
+               thumbnail TEXT,
+               stored_at REAL
+            )
+            """
+         )
+         self.__db.execute("CREATE INDEX IF NOT EXISTS metadata_stored_at ON metadata (stored_at)")
+         self.__db.commit()
+      except sqlite3.Error as e:
+         print(f"Failed to open metadata cache: {e}")
+         self.__db = None
+      
+      return self.__db
+
+   def get(self, video_id: str) -> dict | None:
+      """
+      Looks up metadata for a video, first in memory and then on disk.
+
+      Returns:
+         A dictionary with id, title, author, duration and thumbnail, or None.
+      """
+      metadata = self.__memory.get(video_id)
+      if metadata is not None:
+         self.hits += 1
+         return metadata
+      
+      db = self.__connect()
+      row = None
+      if db is not None:
+         try:
+            row = db.execute(
+               "SELECT title, author, duration, thumbnail, stored_at FROM metadata WHERE video_id = ?",
+               (video_id,)
+            ).fetchone()
+         except sqlite3.Error as e:
+            print(f"Metadata cache read error: {e}")
+
+      if row is None or row[4] + self.__ttl < time.time():
+         self.misses += 1
+         return None
+
+      metadata = {
+         "id": video_id,
+         "title": row[0],
+         "author": row[1],
+         "duration": row[2],
+         "thumbnail": row[3],
+      }
+      # Remaining lifetime is carried over so the memory tier never outlives the disk entry
+      self.__memory.put(video_id, metadata, ttl=row[4] + self.__ttl - time.time())
+      self.hits += 1
+      return metadata
+
+   def put(self, metadata: dict) -> None:
+      """
+      Stores metadata in both tiers. The dictionary must contain an "id" key.
+      """
+      video_id = metadata.get("id")
+      if not video_id:
+         return
+      
+      self.__memory.put(video_id, metadata)
+
+      db = self.__connect()
+      if db is None:
+         return
+      
+      try:
+         db.execute(
+            "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?)",
+            (
+               video_id,
+               metadata.get("title"),
+               metadata.get("author"),
+               metadata.get("duration", 0),
+               metadata.get("thumbnail"),
+               time.time()
+            )
+         )
+         # Trimming scans the table, so it only runs every few hundred writes
+         self.__writes += 1
+         if self.__writes % 256 == 0:
+            self.__evict(db)
+         db.commit()
+      except sqlite3.Error as e:
+         print(f"Metadata cache write error: {e}")
+
+   def __evict(self, db: sqlite3.Connection) -> None:
+      """
+      Removes expired rows and trims the table to the configured size.
+      """
+      db.execute("DELETE FROM metadata WHERE stored_at < ?", (time.time() - self.__ttl,))
+      db.execute(
+         """
+         DELETE FROM metadata WHERE video_id IN (
+            SELECT video_id FROM metadata ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+         )
+         """,
+         (self.__disk_size,)
+      )
+
+   def close(self) -> None:
+      if self.__db is not None:
+         self.__db.close()
+         self.__db = None
+
+class SearchCache:
+   """
+   Cache of /search results keyed by a normalised form of the query,
+   so "Never Gonna Give You Up!" and "never gonna  give you up" share one entry.
+   """
+   def __init__(self, maxsize: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL):
+      self.__results = LRUCache(maxsize, ttl)
+      self.hits = 0
+      self.misses = 0
+
+   @staticmethod
+   def normalize(query: str) -> str:
+      """
+      Case-folds the query, drops punctuation and collapses whitespace.
+      """
+      query = unicodedata.normalize("NFKC", query).casefold()
+      query = "".join(
+         " " if unicodedata.category(ch).startswith("P") else ch
+         for ch in query
+      )
+      return " ".join(query.split())
+
+   def get(self, query: str) -> dict | None:
+      """
+      Returns the cached metadata of the first result, or None.
+      """
+      metadata = self.__results.get(self.normalize(query))
+      if metadata is None:
+         self.misses += 1
+      else:
+         self.hits += 1
+      return metadata
+
+   def put(self, query: str, metadata: dict) -> None:
+      key = self.normalize(query)
+      if key and metadata.get("id"):
+         self.__results.put(key, metadata)
+
+# Process-wide caches shared by all guilds
+metadata_cache = MetadataCache()
+search_cache = SearchCache()
@@ -0,0 +1,196 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from handler.config import (
+   EXTRACTION_WORKERS, 
+   EXTRACTION_TIMEOUT, 
+   EXTRACTION_BACKEND, 
+   EXTRACTION_MAX_JOBS_PER_WORKER,
+   PLAYLIST_WORKERS,
+   PLAYLIST_PAGE_TIMEOUT
+)
+
+class ExtractionTimeout(Exception):
+   """
+   Raised when a yt-dlp lookup does not finish within the configured timeout.
+   """
+   pass
+
+class ExtractionExecutor:
+   """
+   Runs blocking yt-dlp calls in a bounded worker pool so the event loop
+   (gateway heartbeats, other guilds' commands, playback callbacks) is never blocked.
+
+   In "process" mode the functions and their arguments must be picklable,
+   which means module-level functions returning plain data.
+   """
+   def __init__(
+         self, 
+         max_workers: int = EXTRACTION_WORKERS, 
+         timeout: float = EXTRACTION_TIMEOUT,
+         backend: str = EXTRACTION_BACKEND,
+         max_jobs_per_worker: int = EXTRACTION_MAX_JOBS_PER_WORKER
+      ):
+      """
+      Args:
+         max_workers: Number of workers available for extraction.
+         timeout: Default per-call timeout in seconds.
+         backend: "thread" or "process".
+         max_jobs_per_worker: Jobs after which a worker process is recycled (process mode only).
+      """
+      if backend not in ("thread", "process"):
+         raise ValueError(f"Unknown extraction backend: {backend}")
+      
+      self.__max_workers = max_workers
+      self.__timeout = timeout
+      self.__backend = backend
+      self.__max_jobs_per_worker = max_jobs_per_worker
+      self.__initializer = None
+      self.__executor: Executor | None = None
+      # Limits how many calls may wait for a worker, so a burst of commands
+      # cannot pile up an unbounded backlog inside the pool
+      self.__slots = asyncio.Semaphore(max_workers * 2)
+
+   @property
+   def max_workers(self) -> int:
+      return self.__max_workers
+
+   @property
+   def backend(self) -> str:
+      return self.__backend
+
+   def start(self, initializer=None) -> None:
+      """
+      Creates the worker pool.
+
+      Args:
+         initializer: Optional blocking callable preparing a worker, e.g. warming the
+            YoutubeDL pools. Runs once per worker process in process mode, and once
+            in the background in thread mode where the workers share state.
+      """
+      if self.__executor is not None:
+         return
+      
+      self.__initializer = initializer
+
+      if self.__backend == "process":
+         self.__executor = ProcessPoolExecutor(
+            max_workers=self.__max_workers,
+            initializer=initializer,
+            max_tasks_per_child=self.__max_jobs_per_worker
+         )
+      else:
+         self.__executor = ThreadPoolExecutor(
+            max_workers=self.__max_workers,
+            thread_name_prefix="extraction"
+         )
+         if initializer is not None:
+            self.__executor.submit(initializer)
+
+   def __get_executor(self) -> Executor:
+      if self.__executor is None:
+         self.start(self.__initializer)
+      return self.__executor
+
+   async def run(self, func, *args, timeout: float | None = None, **kwargs):
+      """
+      Executes a blocking function in the worker pool and awaits its result.
+
+      Cancelling the awaiting task (or hitting the timeout) releases the caller immediately.
+      A job that has not started yet is dropped; a job already running finishes in the
+      background and its result is discarded.
+
+      Args:
+         func: The blocking callable to run.
+         timeout: Per-call timeout in seconds, including the wait for a free slot,
+            defaults to the executor timeout.
+
+      Raises:
+         ExtractionTimeout: If the call did not finish in time.
+
+      Returns:
+         Whatever `func` returns.
+      """
+      loop = asyncio.get_running_loop()
+      timeout = self.__timeout if timeout is None else timeout
+      deadline = loop.time() + timeout
+
+      # Waiting for a free slot counts against the timeout, so a saturated pool cannot hold callers indefinitely
+      try:
+         await asyncio.wait_for(self.__slots.acquire(), timeout=timeout)
+      except asyncio.TimeoutError:
+         raise ExtractionTimeout(f"Extraction did not finish within {timeout} seconds")
+      try:
+         future = loop.run_in_executor(
+            self.__get_executor(),
+            functools.partial(func, *args, **kwargs)
+         )
+         try:
+            return await asyncio.wait_for(future, timeout=max(deadline - loop.time(), 0))
+         except asyncio.TimeoutError:
+            raise ExtractionTimeout(f"Extraction did not finish within {timeout} seconds")
+      finally:
+         self.__slots.release()
+
+   def shutdown(self, wait: bool = False) -> None:
+      """
+      Stops the worker pool. Pending jobs that have not started are cancelled.
+      """
+      if self.__executor is not None:
+         self.__executor.shutdown(wait=wait, cancel_futures=True)
+         self.__executor = None
+
+class SingleFlight:
+   """
+   Coalesces concurrent identical calls: while a call for a key is in flight,
+   later callers await the same result instead of starting their own.
+   """
+   def __init__(self):
+      self.__in_flight: dict = {}
+      # Total calls made and how many of them joined an in-flight call
+      self.calls = 0
+      self.coalesced = 0
+
+   @property
+   def in_flight(self) -> int:
+      return len(self.__in_flight)
+
+   async def do(self, key, func, *args, **kwargs):
+      """
+      Runs `func(*args, **kwargs)` unless a call with the same key is already running.
+
+      The shared call runs in its own task, so a caller that gets cancelled does not
+      cancel the lookup for everyone else waiting on it.
+
+      Args:
+         key: Hashable identity of the call, e.g. ("url", video_id).
+         func: Coroutine function performing the work.
+
+      Returns:
+         The result of the shared call. Exceptions are raised to every caller.
+      """
+      self.calls += 1
+      task = self.__in_flight.get(key)
+
+      if task is None:
+         task = asyncio.ensure_future(func(*args, **kwargs))
+         self.__in_flight[key] = task
+         task.add_done_callback(lambda done: self.__finish(key, done))
+      else:
+         self.coalesced += 1
+
+      return await asyncio.shield(task)
+
+   def __finish(self, key, task: asyncio.Future) -> None:
+      if self.__in_flight.get(key) is task:
+         del self.__in_flight[key]
+      # Mark the exception as retrieved in case every caller was cancelled
+      if not task.cancelled():
+         task.exception()
+
+# Process-wide executor shared by /play, /search and stream refreshes
+extraction_executor = ExtractionExecutor()
+
+# Playlist listing is slow and paged, so it gets a small pool of its own
+# and never holds up the single-track lookups
+playlist_executor = ExtractionExecutor(max_workers=PLAYLIST_WORKERS, timeout=PLAYLIST_PAGE_TIMEOUT)
@@ -0,0 +1,77 @@
+import importlib.util
+import httpx
+from handler.config import (
+   HTTP_MAX_CONNECTIONS,
+   HTTP_MAX_KEEPALIVE_CONNECTIONS,
+   HTTP_KEEPALIVE_EXPIRY,
+   HTTP_TIMEOUT,
+   HTTP2
+)
+
+class HttpClient:
+   """
+   Process-wide pooled HTTP client.
+
+   Keeps connections to googlevideo and other hosts alive between requests,
+   so a track start does not pay for a new TCP and TLS handshake.
+   """
+   def __init__(
+         self,
+         max_connections: int = HTTP_MAX_CONNECTIONS,
+         max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+         keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+         timeout: float = HTTP_TIMEOUT,
+         http2: bool = HTTP2
+      ):
+      self.__limits = httpx.Limits(
+         max_connections=max_connections,
+         max_keepalive_connections=max_keepalive_connections,
+         keepalive_expiry=keepalive_expiry
+      )
+      self.__timeout = timeout
+      self.__http2 = http2 and importlib.util.find_spec("h2") is not None
+      if http2 and not self.__http2:
+         print("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+      self.__client: httpx.AsyncClient | None = None
+
+   @property
+   def client(self) -> httpx.AsyncClient:
+      """
+      The underlying httpx client. Started on first use if `start` was not called.
+      """
+      if self.__client is None or self.__client.is_closed:
+         self.start()
+      return self.__client
+
+   def start(self) -> None:
+      """
+      Opens the connection pool.
+      """
+      if self.__client is not None and not self.__client.is_closed:
+         return
+      self.__client = httpx.AsyncClient(
+         limits=self.__limits,
+         timeout=self.__timeout,
+         http2=self.__http2,
+         follow_redirects=True
+      )
+
+   async def close(self) -> None:
+      """
+      Closes every pooled connection.
+      """
+      if self.__client is not None:
+         await self.__client.aclose()
+         self.__client = None
+
+   async def get(self, url: str, **kwargs) -> httpx.Response:
+      return await self.client.get(url, **kwargs)
+
+   def stream(self, method: str, url: str, **kwargs):
+      """
+      Opens a streaming request, to be used as `async with http_client.stream(...)`.
+      """
+      return self.client.stream(method, url, **kwargs)
+
+# Process-wide client, started in Bot.run and closed on shutdown
+http_client = HttpClient()
@@ -0,0 +1,133 @@
+import weakref
+import discord
+from handler.track import Track, TrackInfo
+from handler.config import PAGE_SIZE, PAGE_CACHE_SIZE, PAGE_VIEW_TIMEOUT
+from utils.cache import LRUCache
+from utils.utils import formatDuration
+
+# Listing line of every video with the title and duration it was built from,
+# dropped together with its metadata
+_rows: "weakref.WeakKeyDictionary[TrackInfo, tuple]" = weakref.WeakKeyDictionary()
+
+# Rendered pages of all guilds. Keys carry the list version, so a changed list never hits a stale page.
+_page_cache = LRUCache(PAGE_CACHE_SIZE, ttl=3600)
+
+def trackRow(track: Track) -> str:
+   """
+   Returns the markdown line shown for a track in queue and history listings.
+
+   :param track: track to describe
+   :return: "[title](url) `[duration]`" with long titles shortened
+   """
+   info = track.info
+   cached = _rows.get(info)
+   # Shared metadata may be completed later, e.g. the duration of a playlist entry
+   if cached is None or cached[0] != track.title or cached[1] != track.duration:
+      title = track.title[:50] + "..." if len(track.title) > 53 else track.title
+      cached = (track.title, track.duration, f"[{title}]({track.url}) `[{formatDuration(track.duration)}]`")
+      _rows[info] = cached
+   return cached[2]
+
+class TrackPageView(discord.ui.View):
+   """
+   Embed of the queue or the history with buttons to page through it.
+
+   The field listing the tracks is cached per guild, list version, locale and page,
+   so flipping back and forth through an unchanged list never builds it again.
+
+   The view outlives the command that sent it, so it keeps only the guild and looks its
+   MusicHandler up on every button press: the handler may have been hibernated and revived since.
+   """
+   QUEUE = "queue"
+   HISTORY = "history"
+
+   def __init__(self, bot, guild_id: int, kind: str):
+      super().__init__(timeout=PAGE_VIEW_TIMEOUT)
+      self.__bot = bot
+      self.__guild_id = guild_id
+      self.__kind = kind
+      self.__page = 0
+      self.__pages = 1
+
+   @property
+   def pages(self) -> int:
+      return self.__pages
+
+   def __text(self, key: str, **kwargs) -> str:
+      return self.__bot.locale_manager.get_text(self.__guild_id, key, **kwargs)
+
+   def __render_field(self, musicHandler, number: int) -> tuple:
+      """
+      Builds the tracks field of a page.
+
+      Returns:
+         Field name, field value, the page actually shown and the number of pages.
+      """
+      if self.__kind == self.QUEUE:
+         page = musicHandler.get_queue_page(number, PAGE_SIZE)
+         name_key, empty_key = "queue.next_in_list", "queue.queue_empty"
+      else:
+         page = musicHandler.get_history_page(number, PAGE_SIZE)
+         name_key, empty_key = "queue.previous_in_list", "queue.history_empty"
+
+      if not page.total:
+         return self.__text(name_key), self.__text(empty_key), page.page, page.pages
+
+      name = self.__text(name_key) + " (" + self.__text("queue.total") + f": {formatDuration(page.total_duration)})"
+      value = "\n".join(
+         f"`{page.start + i + 1}.` {trackRow(track)}" for i, track in enumerate(page.items)
+      )
+      return name, value, page.page, page.pages
+
+   def render(self, musicHandler) -> discord.Embed:
+      """
+      Builds the embed for the current page and updates the buttons.
+
+      Args:
+         musicHandler: The guild's MusicHandler, held by the caller while rendering.
+      """
+      if self.__kind == self.QUEUE:
+         version = musicHandler.get_queue_version()
+      else:
+         version = musicHandler.get_history_version()
+      locale = self.__bot.locale_manager.get_guild_locale(self.__guild_id)
+      key = (self.__guild_id, self.__kind, version, locale, self.__page)
+
+      field = _page_cache.get(key)
+      if field is None:
+         field = self.__render_field(musicHandler, self.__page)
+         _page_cache.put(key, field)
+      name, value, self.__page, self.__pages = field
+
+      embed = discord.Embed(
+         title=self.__text("queue.title_queue" if self.__kind == self.QUEUE else "queue.title_history"),
+         color=0x5865F2
+      )
+
+      current_track = musicHandler.get_current_track()
+      if not current_track or current_track.empty:
+         embed.description = self.__text("queue.nothing_playing") + "\n"
+      else:
+         embed.description = self.__text("queue.currently_playing") + f"\n🚀 {trackRow(current_track)}\n"
+         if current_track.thumbnail:
+            embed.set_thumbnail(url=current_track.thumbnail)
+
+      embed.add_field(name=name, value=value, inline=False)
+      if self.__pages > 1:
+         embed.set_footer(text=self.__text("queue.page", page=self.__page + 1, pages=self.__pages))
+
+      self.previous.disabled = self.__page == 0
+      self.next.disabled = self.__page >= self.__pages - 1
+      return embed
+
+   @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+   async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+      self.__page = max(self.__page - 1, 0)
+      with self.__bot.musicHandler(self.__guild_id) as musicHandler:
+         await interaction.response.edit_message(embed=self.render(musicHandler), view=self)
+
+   @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+   async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+      self.__page += 1
+      with self.__bot.musicHandler(self.__guild_id) as musicHandler:
+         await interaction.response.edit_message(embed=self.render(musicHandler), view=self)
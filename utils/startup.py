@@ -0,0 +1,54 @@
+import threading
+import time
+from contextlib import contextmanager
+
+class StartupProfile:
+   """
+   Collects how long the parts of a cold start take: imports, initialisation
+   and cog loading, plus the time until the bot is ready.
+   Times are measured from when this module is first imported.
+   """
+   def __init__(self):
+      self.__origin = time.perf_counter()
+      # (section, name, milliseconds) in the order they finished
+      self.__entries: list[tuple[str, str, float]] = []
+      self.__lock = threading.Lock()
+
+   @property
+   def elapsed_ms(self) -> float:
+      return (time.perf_counter() - self.__origin) * 1000
+
+   def record(self, section: str, name: str, milliseconds: float) -> None:
+      with self.__lock:
+         self.__entries.append((section, name, milliseconds))
+
+   @contextmanager
+   def measure(self, section: str, name: str):
+      """
+      Records the duration of the `with` block under `section` and `name`.
+      """
+      started = time.perf_counter()
+      try:
+         yield
+      finally:
+         self.record(section, name, (time.perf_counter() - started) * 1000)
+
+   def entries(self, section: str | None = None) -> list[tuple[str, str, float]]:
+      with self.__lock:
+         return [entry for entry in self.__entries if section is None or entry[0] == section]
+
+   def report(self) -> str:
+      """
+      Formats every measurement grouped by section, slowest first.
+      """
+      lines = [f"Startup profile ({self.elapsed_ms:.0f} ms since start):"]
+      sections = dict.fromkeys(section for section, _, _ in self.entries())
+      for section in sections:
+         entries = sorted(self.entries(section), key=lambda entry: entry[2], reverse=True)
+         lines.append(f"  {section}: {sum(entry[2] for entry in entries):.1f} ms")
+         for _, name, milliseconds in entries:
+            lines.append(f"    {name:<24} {milliseconds:8.1f} ms")
+      return "\n".join(lines)
+
+# Process-wide profile, filled in by main.py, the bot and lazily imported modules
+startup_profile = StartupProfile()
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from handler.track import Track
+from handler.config import STREAM_URL_EXPIRY_MARGIN
+
+class StreamUrlManager:
+   """
+   Keeps track stream urls usable without probing them before every track start.
+
+   Googlevideo urls carry an `expire=` timestamp, so a url that is still valid for the
+   whole track is trusted as is. Urls that are about to expire are refreshed in the
+   background for the upcoming queue entries and the recent history.
+   """
+   def __init__(self, resolver, prober, margin: float = STREAM_URL_EXPIRY_MARGIN):
+      """
+      Args:
+         resolver: Coroutine function taking a video url and returning a yt-dlp info
+            dictionary with a fresh stream url ("url") and its codec ("acodec").
+         prober: Coroutine function taking a stream url and returning whether it responds.
+            Only used for urls that carry no expiry.
+         margin: Seconds of validity required on top of the track duration.
+      """
+      self.__resolver = resolver
+      self.__prober = prober
+      self.__margin = margin
+      # Background refreshes in progress, keyed by the id of the track being refreshed
+      self.__in_flight: dict[int, asyncio.Task] = {}
+      self.refreshed = 0
+      self.trusted = 0
+      self.probed = 0
+
+   def is_fresh(self, track: Track) -> bool | None:
+      """
+      Checks whether the track's stream url will stay valid until the track ends.
+
+      Returns:
+         True or False when the url carries an expiry, None when the expiry is unknown.
+      """
+      if not track.stream_url:
+         return False
+      
+      expires_at = track.stream_expires_at
+      if expires_at is None:
+         return None
+      
+      return expires_at - time.time() > track.duration + self.__margin
+
+   async def ensure_fresh(self, track: Track) -> Track:
+      """
+      Makes sure the track has a usable stream url, refreshing it only when needed.
+
+      Args:
+         track: The track about to be played.
+
+      Returns:
+         The same track with a working stream url.
+      """
+      task = self.__in_flight.get(id(track))
+      if task is not None:
+         # A background refresh is already running, reuse its result
+         await asyncio.shield(task)
+
+      fresh = self.is_fresh(track)
+      if fresh is None:
+         self.probed += 1
+         fresh = await self.__prober(track.stream_url)
+      elif fresh:
+         self.trusted += 1
+      
+      if not fresh:
+         await self.__refresh(track)
+      
+      return track
+
+   async def refresh(self, track: Track) -> Track:
+      """
+      Resolves a new stream url for the track regardless of the current one's expiry,
+      e.g. after the stream broke during playback.
+      """
+      await self.__refresh(track)
+      return track
+
+   def schedule_refresh(self, tracks) -> None:
+      """
+      Refreshes, in the background, every track whose stream url is missing or expiring.
+
+      Args:
+         tracks: Iterable of tracks that may be played soon.
+      """
+      for track in tracks:
+         if track.empty or id(track) in self.__in_flight:
+            continue
+         if self.is_fresh(track) is not False:
+            continue
+
+         key = id(track)
+         task = asyncio.create_task(self.__refresh_in_background(track))
+         self.__in_flight[key] = task
+         task.add_done_callback(lambda _, key=key: self.__in_flight.pop(key, None))
+
+   async def __refresh(self, track: Track) -> None:
+      info = await self.__resolver(track.url)
+      track.stream_url = info.get("url", "")
+      track.codec = info.get("acodec")
+      self.refreshed += 1
+
+   async def __refresh_in_background(self, track: Track) -> None:
+      try:
+         await self.__refresh(track)
+      except Exception as e:
+         # The track is refreshed again synchronously when it starts playing
+         print(f"Failed to refresh stream url for {track.url}: {e}")
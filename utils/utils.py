@@ -1,9 +1,18 @@
-from handler.track import Track
+from handler.track import Track, BEGIN_URL
+from handler.config import PLAYLIST_MAX_ENTRIES, PLAYLIST_PAGE_SIZE
+import asyncio
 import re
-import yt_dlp
+from urllib.parse import urlparse, parse_qs
 import discord
-from handler.config import YDL_OPTIONS, YDL_OPTIONS_FROM_TITLE
-import httpx
+from utils.ydl_pool import extractInfo, listPlaylistEntries
+from utils.http_client import http_client
+from utils.extraction import extraction_executor, playlist_executor, SingleFlight
+from utils.cache import metadata_cache, search_cache
+from utils.stream_urls import StreamUrlManager
+
+__VIDEO_ID_PATTERN = re.compile(
+   r"(?:youtu\.be/|youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/))([A-Za-z0-9_-]{11})"
+)
 
 def createEmbed(track: Track) -> discord.Embed:
    # Format the duration nicely (HH:MM:SS) for the embed message
@@ -57,41 +66,93 @@ async def isValidUrl(url: str) -> bool:
       """
       return bool(re.compile(r"^https://[^\s]+$").match(url))
    
-async def updateWorkingStreamLink(track: Track) -> str:
+def extractVideoId(url: str) -> str | None:
+   """
+   Extracts the YouTube video ID from a link.
+
+   Supports youtu.be, watch?v=, shorts, embed and live links.
+
+   Args:
+      url: The link to the video.
+
+   Returns:
+      The 11-character video ID, or None if the link is not a recognised YouTube video.
+   """
+   match = __VIDEO_ID_PATTERN.search(url)
+   return match.group(1) if match else None
+
+def isPlaylistUrl(url: str) -> bool:
+   """
+   Checks whether the link points to a YouTube playlist.
+
+   Args:
+      url: The link provided by the user.
+
+   Returns:
+      True if the link carries a `list=` parameter.
+   """
+   return bool(parse_qs(urlparse(url).query).get("list"))
+
+async def updateWorkingStreamLink(track: Track) -> Track:
    """
-   Проверяет стрим ссылку на работоспособность. Если ссылка недоступна, то обновляет
+   Проверяет стрим ссылку на работоспособность. Если ссылка недоступна, то обновляет.
+
+   Ссылки с параметром `expire=` не проверяются запросом, пока они действительны
+   до конца трека; запрос выполняется только для ссылок без срока действия.
 
    Args:
       track: Трек, который нужно обновить
 
    Returns:
-      Если ссылка работоспособна, то она же и вернется, иначе вернется обновленная ссылка
+      Тот же трек с рабочей ссылкой на поток
    """
-   stream_url = track.stream_url
-   is_valid = False
-   
-   if stream_url:
-      try:
-         headers = {
-            "Range": "bytes=0-0" # Запрашиваем только первый байт
-         }
-         async with httpx.AsyncClient(follow_redirects=True) as client:
-               response = await client.get(stream_url, headers=headers, timeout=5.0)
-               # 200 или 206 означают успех
-               is_valid = response.status_code in (200, 206)
-      except Exception as e:
-         print(f"Validation error: {e}")
-         is_valid = False
-
-   if not is_valid:
-      track.stream_url = await __updateInfo(track.url)
-      return track
-   
-   return track
+   return await stream_url_manager.ensure_fresh(track)
+
+async def refreshStreamLink(track: Track) -> Track:
+   """
+   Принудительно получает новую ссылку на поток, например после обрыва во время воспроизведения.
+
+   Args:
+      track: Трек, который нужно обновить
+
+   Returns:
+      Тот же трек с новой ссылкой на поток
+   """
+   return await stream_url_manager.refresh(track)
+
+def scheduleStreamRefresh(tracks) -> None:
+   """
+   Обновляет в фоне ссылки на поток для треков, которые скоро будут воспроизведены.
+
+   Args:
+      tracks: Треки из начала очереди и конца истории
+   """
+   stream_url_manager.schedule_refresh(tracks)
+
+async def probeStreamLink(stream_url: str) -> bool:
+   """
+   Проверяет доступность стрим ссылки, запрашивая только первый байт.
+
+   Args:
+      stream_url: Ссылка на поток
+
+   Returns:
+      True, если сервер ответил 200 или 206
+   """
+   try:
+      headers = {
+         "Range": "bytes=0-0" # Запрашиваем только первый байт
+      }
+      response = await http_client.get(stream_url, headers=headers, timeout=5.0)
+      # 200 или 206 означают успех
+      return response.status_code in (200, 206)
+   except Exception as e:
+      print(f"Validation error: {e}")
+      return False
 
 async def __updateInfo(url: str):
    """
-   Retrieves stream link
+   Retrieves stream link and its audio codec
    
    Args:
       url: The link to the video. 
@@ -100,15 +161,14 @@ async def __updateInfo(url: str):
       Exception: If yt-dlp returns an empty information dictionary.
 
    Returns:
-      Link to audio stream
+      Compact info dictionary with the audio stream link ("url") and codec ("acodec")
    """
-   with yt_dlp.YoutubeDL(YDL_OPTIONS) as ydl:
-      info = ydl.extract_info(url, download=False)
-      
-      if not info:
-         raise Exception("yt-dlp returned empty info dictionary")
-   
-      return info.get("url", "")
+   info = await _coalescedExtract(("url", extractVideoId(url) or url), "url", url)
+
+   if not info:
+      raise Exception("yt-dlp returned empty info dictionary")
+
+   return info
 
 async def extractInfoByUrl(url: str) -> Track:
       """ 
@@ -124,21 +184,21 @@ async def extractInfoByUrl(url: str) -> Track:
       Returns:
          A populated Track object with all relevant metadata.
       """
-      with yt_dlp.YoutubeDL(YDL_OPTIONS) as ydl:
-         info = ydl.extract_info(url, download=False)
-         
-         if not info:
-            raise Exception("yt-dlp returned empty info dictionary")
-
-         track = Track()
-         track.title = info.get("title", "Unknown track")     
-         track.author = info.get("uploader", "Unknown author")
-         track.duration = int(info.get("duration", 0))
-         track.stream_url = info.get("url", "")
-         track.thumbnail = info.get("thumbnail")
-         # Constructs the full display URL from the base URL and video ID
-         track.url = (track.begin_url + info.get("id", "")) 
-         return track
+      video_id = extractVideoId(url)
+      if video_id:
+         metadata = metadata_cache.get(video_id)
+         if metadata is not None:
+            # Cache hit: the stream url is resolved later, when playback starts
+            return _trackFromMetadata(metadata)
+
+      info = await _coalescedExtract(("url", video_id or url), "url", url)
+      
+      if not info:
+         raise Exception("yt-dlp returned empty info dictionary")
+
+      track = _trackFromInfo(info)
+      metadata_cache.put(_metadataFromInfo(info))
+      return track
       
 async def extractInfoByTitle(title: str) -> Track: 
    """ 
@@ -154,18 +214,128 @@ async def extractInfoByTitle(title: str) -> Track:
       Returns:
          A populated Track object with all relevant metadata.
       """
-   with yt_dlp.YoutubeDL(YDL_OPTIONS_FROM_TITLE) as ydl:
-      info = (ydl.extract_info(f"ytsearch:{title}", download=False))['entries'][0]
-      
-      if not info:
-         raise Exception("yt-dlp returned empty info dictionary")
-      
-      track = Track()
-      track.title = info.get("title", "Unknown track")     
-      track.author = info.get("uploader", "Unknown author")
-      track.duration = int(info.get("duration", 0))
-      track.stream_url = info.get("url", "")
-      track.thumbnail = info.get("thumbnail")
+   metadata = search_cache.get(title)
+   if metadata is not None:
+      # Cache hit: the stream url is resolved later, when playback starts
+      return _trackFromMetadata(metadata)
+
+   info = await _coalescedExtract(
+      ("search", search_cache.normalize(title)), 
+      "title", 
+      f"ytsearch:{title}"
+   )
+   
+   if not info:
+      raise Exception("yt-dlp returned empty info dictionary")
+   
+   metadata = _metadataFromInfo(info)
+   metadata_cache.put(metadata)
+   search_cache.put(title, metadata)
+   return _trackFromInfo(info)
+
+async def iterPlaylist(url: str, limit: int = PLAYLIST_MAX_ENTRIES):
+   """ 
+   Lazily enumerates a playlist one page at a time, yielding entries as soon as their page is listed.
+
+   Pages are listed in the playlist executor, bounded and timed out like any other
+   extraction; the next page is listed while the entries of the current one are consumed.
+   Entries are extracted flat, so the yielded tracks have metadata but no stream url;
+   it is resolved when the track is about to play.
+
+   Args:
+      url: Playlist link.
+      limit: Maximum number of playlist positions to list.
+
+   Raises:
+      ExtractionTimeout: If a page did not list in time.
+      Exception: If yt-dlp fails to list the playlist.
+
+   Yields:
+      Track objects without a stream url.
+   """
+   def listPage(start: int) -> asyncio.Future:
+      count = min(PLAYLIST_PAGE_SIZE, limit - start)
+      return asyncio.ensure_future(playlist_executor.run(listPlaylistEntries, url, start, count))
+
+   start = 0
+   pending = listPage(start) if limit > 0 else None
+   try:
+      while pending is not None:
+         entries, listed = await pending
+         requested = min(PLAYLIST_PAGE_SIZE, limit - start)
+         start += listed
+         pending = listPage(start) if listed == requested and start < limit else None
+         
+         for entry in entries:
+            yield _trackFromMetadata(_metadataFromInfo(entry))
+   finally:
+      if pending is not None:
+         pending.cancel()
+
+def coalescingStats() -> dict:
+   """
+   Counters of the extraction coalescing layer.
+
+   Returns:
+      Total extraction calls, how many joined an in-flight call, and how many are running.
+   """
+   return {
+      "calls": _extractions.calls,
+      "coalesced": _extractions.coalesced,
+      "in_flight": _extractions.in_flight,
+   }
+
+async def _coalescedExtract(key: tuple, profile: str, query: str) -> dict | None:
+   """
+   Runs a yt-dlp lookup in the extraction executor, sharing it with concurrent
+   callers that ask for the same video or search query.
+
+   Callers get the same info dictionary and must not mutate it.
+   """
+   return await _extractions.do(key, extraction_executor.run, extractInfo, profile, query)
+
+def _trackFromInfo(info: dict) -> Track:
+   """
+   Builds a Track from a yt-dlp info dictionary.
+   """
+   track = Track(
+      title=info.get("title", "Unknown track"),
+      author=info.get("uploader", "Unknown author"),
+      duration=int(info.get("duration") or 0),
+      thumbnail=info.get("thumbnail"),
       # Constructs the full display URL from the base URL and video ID
-      track.url = (track.begin_url + info.get("id", "")) 
-      return track
\ No newline at end of file
+      url=BEGIN_URL + info.get("id", "")
+   )
+   track.stream_url = info.get("url", "")
+   track.codec = info.get("acodec")
+   return track
+
+# In-flight yt-dlp lookups, keyed by video ID or normalised search query
+_extractions = SingleFlight()
+
+# Process-wide stream url manager shared by all guilds
+stream_url_manager = StreamUrlManager(resolver=__updateInfo, prober=probeStreamLink)
+
+def _metadataFromInfo(info: dict) -> dict:
+   """
+   Picks the cacheable metadata out of a yt-dlp info dictionary.
+   """
+   return {
+      "id": info.get("id", ""),
+      "title": info.get("title", "Unknown track"),
+      "author": info.get("uploader", "Unknown author"),
+      "duration": int(info.get("duration") or 0),
+      "thumbnail": info.get("thumbnail"),
+   }
+
+def _trackFromMetadata(metadata: dict) -> Track:
+   """
+   Builds a Track without a stream url from cached metadata.
+   """
+   return Track(
+      title=metadata["title"],
+      author=metadata["author"],
+      duration=metadata["duration"],
+      thumbnail=metadata["thumbnail"],
+      url=BEGIN_URL + metadata["id"]
+   )
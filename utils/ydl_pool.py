@@ -0,0 +1,203 @@
+import multiprocessing
+import queue
+import threading
+from contextlib import contextmanager
+from handler.config import YDL_OPTIONS, YDL_OPTIONS_FROM_TITLE, YDL_OPTIONS_PLAYLIST, EXTRACTION_WORKERS
+from utils.startup import startup_profile
+
+_yt_dlp = None
+
+def _loadYtDlp():
+   """
+   Imports yt-dlp on first use. It is the slowest import of the bot and only
+   the extraction threads or processes need it, so it stays off the startup path.
+   """
+   global _yt_dlp
+   if _yt_dlp is None:
+      with startup_profile.measure("import", "yt_dlp"):
+         import yt_dlp
+      _yt_dlp = yt_dlp
+   return _yt_dlp
+
+class YoutubeDLPool:
+   """
+   Pool of reusable YoutubeDL instances for a single options profile.
+
+   Building a YoutubeDL loads every extractor and sets up the cookie jar and
+   HTTP session, so instances are created once and checked out per lookup.
+   An instance is only ever used by one thread at a time.
+   """
+   def __init__(self, options: dict, size: int = EXTRACTION_WORKERS):
+      """
+      Args:
+         options: yt-dlp options used for every instance in the pool.
+         size: Maximum number of instances, one per concurrent lookup.
+      """
+      self.__options = options
+      self.__size = size
+      self.__idle: queue.LifoQueue = queue.LifoQueue()
+      self.__created = 0
+      self.__lock = threading.Lock()
+
+   def __create(self) -> "yt_dlp.YoutubeDL | None":
+      with self.__lock:
+         if self.__created >= self.__size:
+            return None
+         self.__created += 1
+      
+      try:
+         return _loadYtDlp().YoutubeDL(self.__options)
+      except Exception:
+         with self.__lock:
+            self.__created -= 1
+         raise
+
+   def warm(self, count: int | None = None) -> None:
+      """
+      Creates instances up front so the first lookups do not pay for it.
+
+      Args:
+         count: Number of instances to create, defaults to the pool size.
+      """
+      for _ in range(self.__size if count is None else count):
+         ydl = self.__create()
+         if ydl is None:
+            return
+         self.__idle.put(ydl)
+
+   @contextmanager
+   def acquire(self):
+      """
+      Checks out an instance for the duration of the `with` block.
+      Blocks until one is free when the pool is exhausted.
+      """
+      try:
+         ydl = self.__idle.get_nowait()
+      except queue.Empty:
+         ydl = self.__create() or self.__idle.get()
+      
+      try:
+         yield ydl
+      finally:
+         self.__idle.put(ydl)
+
+   def close(self) -> None:
+      """
+      Closes every idle instance.
+      """
+      while True:
+         try:
+            ydl = self.__idle.get_nowait()
+         except queue.Empty:
+            return
+         ydl.close()
+         with self.__lock:
+            self.__created -= 1
+
+# One pool per extraction profile. In process mode every worker process builds its own.
+url_pool = YoutubeDLPool(YDL_OPTIONS)
+title_pool = YoutubeDLPool(YDL_OPTIONS_FROM_TITLE)
+playlist_pool = YoutubeDLPool(YDL_OPTIONS_PLAYLIST)
+
+POOLS = {
+   "url": url_pool,
+   "title": title_pool,
+   "playlist": playlist_pool,
+}
+
+# Fields of the yt-dlp info dictionary the bot actually uses
+INFO_FIELDS = ("id", "title", "uploader", "duration", "url", "acodec", "thumbnail")
+
+def extractInfo(profile: str, query: str) -> dict | None:
+   """
+   Blocking yt-dlp lookup. Must only be called through the extraction executor.
+
+   Runs in a worker thread or a worker process, so it takes the profile by name and
+   returns a small plain dictionary that can be pickled back to the main process.
+   For search queries the first result is returned.
+
+   Args:
+      profile: Name of the options profile, a key of POOLS.
+      query: Video URL or `ytsearch:` query.
+
+   Returns:
+      The compact info dictionary, or None if yt-dlp found nothing.
+   """
+   with POOLS[profile].acquire() as ydl:
+      info = ydl.extract_info(query, download=False)
+
+   if info and "entries" in info:
+      info = next((entry for entry in info.get("entries") or [] if entry), None)
+   
+   if not info:
+      return None
+   
+   return {field: info[field] for field in INFO_FIELDS if info.get(field) is not None}
+
+def listPlaylistEntries(url: str, start: int, count: int) -> tuple[list, int]:
+   """
+   Blocking listing of one page of a playlist. Must only be called through an extraction executor.
+
+   Only the requested positions are listed, so extractors that page by index fetch just this
+   page; the rest can only walk their continuation pages up to `start + count`.
+
+   Args:
+      url: Playlist link.
+      start: Position of the first entry to list.
+      count: Number of positions to list.
+
+   Returns:
+      Compact info dictionaries with id, title, uploader, duration and thumbnail, and the
+      number of positions listed. Fewer positions than `count` means the playlist ended.
+   """
+   with playlist_pool.acquire() as ydl:
+      # The instance is checked out by this call alone, so the page can be set on it for the lookup
+      ydl.params["playlist_items"] = f"{start + 1}:{start + count}"
+      try:
+         info = ydl.extract_info(url, download=False, process=False)
+         # Processing a flat playlist only lists its entries, and only the requested ones
+         if info and info.get("_type") in ("playlist", "multi_video"):
+            info = ydl.process_ie_result(info, download=False)
+      finally:
+         del ydl.params["playlist_items"]
+
+   if not info:
+      return [], 0
+   # A link to a single video lists as a one-entry playlist
+   page = (info.get("entries") or []) if "entries" in info else [info][start:start + count]
+
+   result = []
+   for entry in page:
+      if not entry or not entry.get("id"):
+         continue
+
+      compact = {field: entry[field] for field in INFO_FIELDS if entry.get(field) is not None}
+      # Flat entries point to the watch page, not the stream
+      compact.pop("url", None)
+      compact.pop("acodec", None)
+      if "uploader" not in compact and entry.get("channel"):
+         compact["uploader"] = entry["channel"]
+      if "thumbnail" not in compact and entry.get("thumbnails"):
+         compact["thumbnail"] = entry["thumbnails"][-1].get("url")
+      result.append(compact)
+   
+   return result, len(page)
+
+def warmPools() -> None:
+   """
+   Pre-creates the instances of every pool. Blocking, run it in the extraction executor.
+
+   A worker process only ever runs one lookup at a time, so there it creates
+   a single instance per profile.
+   """
+   count = 1 if multiprocessing.parent_process() is not None else None
+   try:
+      url_pool.warm(count)
+      title_pool.warm(count)
+   except Exception as e:
+      # Not fatal: missing instances are created on first use
+      print(f"Failed to warm YoutubeDL pools: {e}")
+
+def closePools() -> None:
+   for pool in POOLS.values():
+      pool.close()